@@ -1,18 +1,44 @@
+import time
+from collections import deque
+
 import streamlit as st
-import os
 
-from google_sheets import load_form_data
-from jd_generator import generate_ranked_jd, write_jd_to_docx
-from jd_clarifier import generate_role_specific_clarifying_questions
-from langchain_groq import ChatGroq
+from google_sheets import (
+    load_form_data,
+    start_background_poller,
+    stop_background_poller,
+    sync_status,
+)
+from jd_pipeline import (
+    MODE_MULTI,
+    MODE_SINGLE,
+    index_labels,
+    select_row,
+    generate_final_jd,
+)
+from jd_prefetch import SpeculativePrefetcher
+from jd_store import get_store, row_fingerprint
+from llm_router import get_router, percentile
+
+# Full-script reruns are timed from here (see RERUN TIMINGS)
+_run_start = time.perf_counter()
+
+# ==========================================
+# PAGE CONFIG
+# ==========================================
+st.set_page_config(
+    page_title="AI Job Description Generator",
+    layout="centered"
+)
+
 # ==========================================
 # 🎨 CUSTOM UI THEME (MINIMAL & STYLISH)
 # ==========================================
 # ==========================================
 # 🎨 PASTEL UI THEME (SOFT & MODERN)
 # ==========================================
-st.markdown(
-    """
+# Injected on full reruns only; fragment reruns below don't repeat it
+APP_CSS = """
     <style>
     /* ===== App Background (Pastel Gradient) ===== */
     .stApp {
@@ -112,18 +138,9 @@ st.markdown(
         overflow: hidden;
     }
     </style>
-    """,
-    unsafe_allow_html=True
-)
+"""
 
-
-# ==========================================
-# PAGE CONFIG
-# ==========================================
-st.set_page_config(
-    page_title="AI Job Description Generator",
-    layout="centered"
-)
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 # ==========================================
 # ENV CHECK (FAIL FAST)
@@ -135,10 +152,17 @@ if "GROQ_API_KEY" not in st.secrets:
 # ==========================================
 # INIT LLM
 # ==========================================
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0
-)
+# Routes each prompt type to its model tier (see llm_router.py).
+# One shared router per process: nothing is rebuilt on reruns.
+llm = get_router(st.secrets["GROQ_API_KEY"])
+
+# ==========================================
+# ⏱ RERUN TIMINGS
+# ==========================================
+def record_rerun(scope, start):
+    timings = st.session_state.setdefault("rerun_ms", {})
+    samples = timings.setdefault(scope, deque(maxlen=50))
+    samples.append((time.perf_counter() - start) * 1000)
 
 # ==========================================
 # UI
@@ -147,6 +171,73 @@ st.title("🧠 AI Job Description Generator")
 st.caption("Generate professional JDs directly from Google Form data")
 st.divider()
 
+# ==========================================
+# ⚙️ GENERATION OPTIONS (OPT-IN)
+# ==========================================
+with st.sidebar:
+    single_call = st.toggle(
+        "🧩 Single-call draft",
+        value=False,
+        help="Draft JD, titles and questions in one structured request"
+    )
+    speculative = st.toggle(
+        "⚡ Speculative prefetch",
+        value=False,
+        help="Start drafting as soon as a role is selected"
+    )
+    warm_rows = st.number_input(
+        "Warm next rows after fetch",
+        min_value=0,
+        max_value=10,
+        value=3,
+        disabled=not speculative
+    )
+    max_speculative = st.number_input(
+        "Max speculative drafts per session",
+        min_value=1,
+        max_value=50,
+        value=10,
+        disabled=not speculative
+    )
+
+if "prefetcher" not in st.session_state:
+    st.session_state["prefetcher"] = SpeculativePrefetcher(llm)
+
+prefetcher = st.session_state["prefetcher"]
+prefetcher.max_speculative = max_speculative
+prefetcher.mode = MODE_SINGLE if single_call else MODE_MULTI
+
+# Versioned JD store (output/jd_store.sqlite3)
+store = get_store()
+
+# ==========================================
+# 🔄 SHEET SYNC
+# ==========================================
+# "Fetch Latest" only downloads when the sheet changed since last sync
+def on_background_refresh_change():
+    # The poller is shared by all sessions → stop it only when
+    # switched off here, not whenever a session leaves it off
+    if not st.session_state["background_refresh"]:
+        stop_background_poller()
+
+
+with st.sidebar:
+    if st.toggle(
+        "🔄 Background sheet refresh",
+        value=False,
+        key="background_refresh",
+        help="Poll the sheet every minute and keep it cached",
+        on_change=on_background_refresh_change
+    ):
+        start_background_poller()
+
+    sync = sync_status()
+    st.caption(
+        f"Sheet downloads: {sync['downloads']} · "
+        f"Unchanged fetches skipped: {sync['skipped']} · "
+        f"Background downloads: {sync['background_downloads']}"
+    )
+
 # ==========================================
 # 🔑 HELPER: FIND JOB TITLE COLUMN
 # ==========================================
@@ -175,9 +266,25 @@ if st.button("📥 Fetch Latest Google Form Responses"):
     st.session_state["data"] = df
     st.session_state["job_title_col"] = job_title_col
 
+    # Built once per fetch, not on every rerun
+    st.session_state["labels"] = df["JD_Label"].tolist()
+    st.session_state["label_positions"] = index_labels(df)
+
     st.success(f"✅ {len(df)} responses loaded")
     st.dataframe(df.head())
 
+    if speculative and warm_rows:
+        positions = st.session_state["label_positions"]
+        rows = (
+            select_row(df, label, job_title_col, positions)
+            for label in positions
+        )
+        # Rows already in the store need no warming
+        prefetcher.warm(
+            ((row_fingerprint(r), r) for r in rows if not store.has_draft(r)),
+            warm_rows
+        )
+
 st.divider()
 
 # ==========================================
@@ -189,61 +296,88 @@ def radio_with_none(question, options, key):
     return "Not Applicable" if selected == "None of the above" else selected
 
 # ==========================================
-# JD FLOW
+# STEP 1: ROLE PICKER (FRAGMENT)
 # ==========================================
-if "data" in st.session_state:
-
-    df = st.session_state["data"]
-    job_title_col = st.session_state["job_title_col"]
+# Changing the role reruns ONLY this function
+@st.fragment
+def role_picker(df, job_title_col):
+    start = time.perf_counter()
 
     selected_jd = st.selectbox(
         "🎯 Select Job Title",
-        df["JD_Label"].tolist()
+        st.session_state["labels"]
+    )
+
+    selected_row = select_row(
+        df, selected_jd, job_title_col, st.session_state["label_positions"]
+    )
+    selected_key = row_fingerprint(selected_row)
+
+    # Selection settled → start Step 1 in the background
+    if speculative and not store.has_draft(selected_row):
+        prefetcher.prefetch(selected_key, selected_row)
+
+    force = st.checkbox(
+        "♻️ Regenerate (ignore saved versions)",
+        value=False,
+        key="force_regenerate"
     )
 
     # ================================
-    # STEP 1: GENERATE DRAFT JD
+    # VERSION HISTORY
     # ================================
-    if st.button("🚀 Generate Draft JD"):
+    versions = store.history(selected_row)
+    if versions:
+        with st.expander(f"🗂 Saved versions ({len(versions)})"):
+            st.dataframe(versions, hide_index=True)
 
-        selected_row = df[df["JD_Label"] == selected_jd].iloc[0].copy()
+    record_rerun("role picker", start)
 
-        # Persist original job title
-        selected_row["__job_title__"] = selected_row[job_title_col]
+    if st.button("🚀 Generate Draft JD"):
 
         st.session_state["selected_row"] = selected_row
 
-        with st.spinner("Generating draft JD..."):
-            st.session_state["draft_jd"] = generate_ranked_jd(selected_row)
-
-        with st.spinner("Generating clarifying questions..."):
-            # ✅ FIXED: pass ROW only
-            st.session_state["questions"] = generate_role_specific_clarifying_questions(
-                llm,
-                selected_row
-            )
+        with st.spinner("Generating draft JD & clarifying questions..."):
+            bundle = prefetcher.take(selected_key, selected_row, force=force)
 
+        st.session_state["draft_jd"] = bundle["draft_jd"]
+        st.session_state["questions"] = bundle["questions"]
         st.session_state["answers"] = {}
-        st.success("✅ Draft JD & clarifying questions ready")
+        # New widget keys → no stale answers from the previous draft
+        st.session_state["draft_id"] = st.session_state.get("draft_id", 0) + 1
+        st.session_state.pop("final", None)
 
-    # ================================
-    # STEP 2: SHOW QUESTIONS
-    # ================================
-    if "questions" in st.session_state:
+        # Questions panel lives outside this fragment
+        st.rerun()
+
+# ==========================================
+# STEP 2 + 3: QUESTIONS → FINAL JD (FRAGMENT)
+# ==========================================
+# Answers are collected in a form: radio clicks don't rerun anything,
+# the single submit reruns only this function.
+@st.fragment
+def clarify_and_finalize(job_title_col):
+    start = time.perf_counter()
+
+    st.success("✅ Draft JD & clarifying questions ready")
 
+    draft_id = st.session_state.get("draft_id", 0)
+
+    with st.form(f"clarify_{draft_id}"):
         st.markdown("### 🔍 Clarify Role Requirements")
 
+        answers = {}
         for idx, q in enumerate(st.session_state["questions"]):
-            st.session_state["answers"][q["question"]] = radio_with_none(
+            answers[q["question"]] = radio_with_none(
                 question=q["question"],
                 options=q["options"],
-                key=f"clarify_{idx}"
+                key=f"clarify_{draft_id}_{idx}"
             )
 
-    # ================================
-    # STEP 3: FINAL JD
-    # ================================
-    if st.button("✨ Generate FINAL Job Description"):
+        submitted = st.form_submit_button("✨ Generate FINAL Job Description")
+
+    if submitted:
+        st.session_state["answers"] = answers
 
         row = st.session_state["selected_row"].copy()
 
@@ -251,28 +385,75 @@ if "data" in st.session_state:
             row["__job_title__"] = row[job_title_col]
 
         with st.spinner("Generating FINAL JD..."):
-            final_jd = generate_ranked_jd(
+            st.session_state["final"] = generate_final_jd(
                 row,
-                clarifications=st.session_state.get("answers", {})
+                answers,
+                force=st.session_state.get("force_regenerate", False)
             )
 
-            doc = write_jd_to_docx(final_jd, row)
-
-            os.makedirs("output", exist_ok=True)
-            safe_title = row[job_title_col].replace("/", "_")
-            path = f"output/{safe_title}.docx"
-            doc.save(path)
+        st.session_state["final_title"] = row[job_title_col].replace("/", "_")
 
+    # ================================
+    # RESULTS PANEL
+    # ================================
+    if "final" in st.session_state:
         st.success("🎉 Final JD generated")
 
-        with open(path, "rb") as f:
-            st.download_button(
-                "⬇️ Download JD",
-                f,
-                file_name=f"{safe_title}.docx"
-            )
+        st.download_button(
+            "⬇️ Download JD",
+            st.session_state["final"]["docx"],
+            file_name=f"{st.session_state['final_title']}.docx"
+        )
+
+    record_rerun("questions", start)
+
+# ==========================================
+# JD FLOW
+# ==========================================
+if "data" in st.session_state:
+
+    role_picker(
+        st.session_state["data"],
+        st.session_state["job_title_col"]
+    )
+
+    if "questions" in st.session_state:
+        clarify_and_finalize(st.session_state["job_title_col"])
 
 else:
     st.info("ℹ️ Load Google Form data first")
 
+if speculative:
+    stats = prefetcher.metrics()
+    st.sidebar.caption(
+        f"Hit rate: {stats['hit_rate']:.0%} · "
+        f"In flight: {stats['in_flight']} · "
+        f"Budget left: {stats['budget_left']} · "
+        f"Wasted calls: {stats['wasted_calls']}"
+    )
 
+with st.sidebar.expander("📊 LLM metrics"):
+    st.dataframe(llm.metrics(), hide_index=True)
+
+    if llm.coalescer is not None:
+        shared = llm.coalescer.metrics()
+        st.caption(
+            f"Coalesced: {shared['shared']} shared · "
+            f"{shared['led']} led · {shared['takeovers']} lease takeovers"
+        )
+
+record_rerun("full app", _run_start)
+
+with st.sidebar.expander("⏱ Rerun timings"):
+    st.dataframe(
+        [
+            {
+                "scope": scope,
+                "runs": len(samples),
+                "p50_ms": round(percentile(list(samples), 50), 1),
+                "max_ms": round(max(samples), 1),
+            }
+            for scope, samples in st.session_state.get("rerun_ms", {}).items()
+        ],
+        hide_index=True
+    )
@@ -0,0 +1,54 @@
+# batch_generate.py
+#
+# Generates Step 1 (draft JD + clarifying questions) for a backlog
+# of sheet rows and saves them to the JD store, so recruiters open
+# those roles instantly in the app.
+#
+# - Rows come from load_form_records() (compact, pandas-free)
+# - Rows already in the store are skipped
+# - Title alternatives are fetched in batched requests
+#
+# Usage:
+#   python batch_generate.py --limit 100
+#   python batch_generate.py --single-call
+
+import argparse
+import time
+
+from google_sheets import load_form_records
+from jd_pipeline import MODE_MULTI, MODE_SINGLE, generate_draft_bundles
+from llm_router import get_router
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate draft JDs for a backlog")
+    parser.add_argument("--limit", type=int, default=None, help="Max rows to process")
+    parser.add_argument("--force", action="store_true", help="Regenerate stored rows")
+    parser.add_argument("--single-call", action="store_true",
+                        help="One structured request per row")
+    args = parser.parse_args()
+
+    rows = load_form_records()[:args.limit]
+    router = get_router()
+
+    start = time.perf_counter()
+    generate_draft_bundles(
+        router,
+        rows,
+        force=args.force,
+        mode=MODE_SINGLE if args.single_call else MODE_MULTI
+    )
+    elapsed = time.perf_counter() - start
+
+    requests = sum(t["requests"] for t in router.metrics())
+    print(f"{len(rows)} rows in {elapsed:.1f}s")
+    print(f"LLM requests: {requests} ({requests / max(len(rows), 1):.2f} per row)")
+    for t in router.metrics():
+        print(
+            f"  {t['tier']:<8}{t['model']:<28}requests={t['requests']:<6}"
+            f"p95={t['p95_s']:.2f}s tokens={t['prompt_tokens']}+{t['completion_tokens']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# bench_generation.py
+#
+# Compares Step 1 generation modes on real rows:
+#   multi  → draft JD, title alternatives, gap questions (3 calls)
+#   single → one structured JSON call (jd_structured.py)
+#
+# Reports end-to-end latency and total tokens per row.
+# Uses the real Groq API and Streamlit Secrets (.streamlit/secrets.toml).
+#
+# Usage:
+#   python bench_generation.py --rows 5
+#   python bench_generation.py --csv sample_rows.csv --repeats 2
+
+import argparse
+import statistics
+import time
+
+import pandas as pd
+
+from google_sheets import load_form_data
+from jd_pipeline import generate_multi_call
+from jd_structured import generate_structured_bundle
+from llm_router import get_router, percentile
+
+
+def _totals(router):
+    totals = {"calls": 0, "fallbacks": 0, "tokens": 0}
+    for tier in router.metrics():
+        totals["calls"] += tier["calls"]
+        totals["fallbacks"] += tier["fallbacks"]
+        totals["tokens"] += tier["prompt_tokens"] + tier["completion_tokens"]
+    return totals
+
+
+def _load_rows(args):
+    df = pd.read_csv(args.csv) if args.csv else load_form_data()
+    df = df.fillna("").head(args.rows)
+
+    rows = []
+    for _, row in df.iterrows():
+        row = row.copy()
+        title_col = next(
+            (k for k in row.index if "job" in k.lower() and "title" in k.lower()),
+            None
+        )
+        row["__job_title__"] = row[title_col] if title_col else ""
+        rows.append(row)
+    return rows
+
+
+def run_mode(router, mode, rows, repeats):
+    latencies, tokens, calls = [], [], []
+    failures = 0
+
+    for _ in range(repeats):
+        for row in rows:
+            before = _totals(router)
+            start = time.perf_counter()
+
+            if mode == "single":
+                try:
+                    generate_structured_bundle(router, row)
+                except Exception:
+                    # Same fallback as jd_pipeline.generate_draft_bundle
+                    failures += 1
+                    generate_multi_call(router, row)
+            else:
+                generate_multi_call(router, row)
+
+            latencies.append(time.perf_counter() - start)
+            after = _totals(router)
+            tokens.append(after["tokens"] - before["tokens"])
+            calls.append(after["calls"] - before["calls"])
+
+    return {
+        "mode": mode,
+        "rows": len(latencies),
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "mean_s": statistics.fmean(latencies),
+        "tokens_per_row": statistics.fmean(tokens),
+        "calls_per_row": statistics.fmean(calls),
+        "fallbacks": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Step 1 generation modes")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--csv", help="Read rows from a CSV export instead of the sheet")
+    args = parser.parse_args()
+
+    rows = _load_rows(args)
+
+    router = get_router()
+    # Every call must really run: no sharing between modes or repeats
+    router.coalescer = None
+
+    results = [run_mode(router, mode, rows, args.repeats) for mode in ("multi", "single")]
+
+    print(f"{'mode':<8}{'rows':>6}{'p50':>9}{'p95':>9}{'mean':>9}{'tokens/row':>12}{'calls/row':>11}{'fallbacks':>11}")
+    for r in results:
+        print(
+            f"{r['mode']:<8}{r['rows']:>6}"
+            f"{r['p50_s']:>8.2f}s{r['p95_s']:>8.2f}s{r['mean_s']:>8.2f}s"
+            f"{r['tokens_per_row']:>12.0f}{r['calls_per_row']:>11.1f}{r['fallbacks']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# bench_intake.py
+#
+# Per-row NON-LLM overhead of the generation hot path:
+# pandas Series rows vs compact IntakeRecords (intake_record.py).
+#
+# Times the row helpers every generation runs (header block, titles,
+# prompt input data, form context, store fingerprint) and measures the
+# memory needed to hold N rows, plus the pandas import cost.
+# No LLM calls are made; Streamlit Secrets must exist because
+# jd_generator reads GROQ_API_KEY at import.
+#
+# Usage:
+#   python bench_intake.py --rows 2000 --repeats 5
+
+import argparse
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from intake_record import records_from_dicts
+from jd_clarifier import build_form_context, resolve_job_title
+from jd_generator import build_header_block, build_input_data, resolve_jd_title
+from jd_store import row_fingerprint
+from load_test import make_fake_loader
+
+
+def hot_path(row):
+    build_header_block(row)
+    resolve_jd_title(row)
+    build_input_data(row)
+    resolve_job_title(row)
+    build_form_context(row)
+    row_fingerprint(row)
+
+
+def series_rows(df):
+    # Same per-row preparation as jd_pipeline.select_row()
+    rows = []
+    for _, row in df.iterrows():
+        row = row.copy()
+        row["__job_title__"] = row["Job Title"]
+        rows.append(row)
+    return rows
+
+
+def time_per_row(rows, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for row in rows:
+            hot_path(row)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows)
+
+
+def memory_of(build):
+    tracemalloc.start()
+    rows = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, size
+
+
+def pandas_import_seconds():
+    code = "import time; t = time.perf_counter(); import pandas; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(out.stdout.strip() or 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Series vs IntakeRecord overhead")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_fake_loader(args.rows, 0)()
+    dicts = df.to_dict("records")
+
+    series, series_bytes = memory_of(lambda: series_rows(df))
+    records, record_bytes = memory_of(lambda: records_from_dicts(dicts))
+
+    series_us = time_per_row(series, args.repeats) * 1e6
+    record_us = time_per_row(records, args.repeats) * 1e6
+
+    print(f"{'rows':<22}{args.rows}")
+    print(f"{'':<22}{'Series':>12}{'IntakeRecord':>14}{'ratio':>8}")
+    print(
+        f"{'hot path / row':<22}{series_us:>10.1f}us{record_us:>12.1f}us"
+        f"{series_us / record_us:>7.1f}x"
+    )
+    print(
+        f"{'memory / row':<22}{series_bytes / args.rows:>11.0f}B"
+        f"{record_bytes / args.rows:>13.0f}B"
+        f"{series_bytes / max(record_bytes, 1):>7.1f}x"
+    )
+    print(f"{'pandas import':<22}{pandas_import_seconds():>11.2f}s{'0.00s':>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -61,32 +61,169 @@
 #     return df
 
 
+import threading
+import time
+
 import gspread
-import pandas as pd
 from google.oauth2.service_account import Credentials
+from googleapiclient.discovery import build
 import streamlit as st
 
-def load_form_data():
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets.readonly",
-        "https://www.googleapis.com/auth/drive.readonly",
-    ]
-
-    creds = Credentials.from_service_account_info(
+from intake_record import records_from_dicts
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.readonly",
+]
+
+SPREADSHEET_ID = "1SpNGsY707CaY6i06knI9F2HJdtAcHxGKq8IjAb17oWo"
+
+# =====================================================
+# LAST SYNCED SHEET (SHARED ACROSS SESSIONS)
+# =====================================================
+_cache = {
+    "version": None,
+    "records": None,
+    "synced_at": None,
+    # Counted for "Fetch Latest" clicks only, not poller ticks
+    "downloads": 0,
+    "skipped": 0,
+    "background_downloads": 0,
+}
+_cache_lock = threading.Lock()
+_poller = None
+_poller_stop = None
+
+
+def _credentials():
+    return Credentials.from_service_account_info(
         st.secrets["google_service_account"],
-        scopes=scopes
+        scopes=SCOPES
     )
 
-    client = gspread.authorize(creds)
+# =====================================================
+# CHANGE DETECTION
+# =====================================================
+def sheet_version(creds):
+    """
+    Cheap change probe: Drive modifiedTime + version of the spreadsheet.
+    Returns None if the probe fails (→ always download).
+
+    No row-count fallback: an edited form response keeps the count,
+    so it would keep serving stale rows (and stale JD fingerprints).
+    """
+    try:
+        drive = build("drive", "v3", credentials=creds, cache_discovery=False)
+        meta = drive.files().get(
+            fileId=SPREADSHEET_ID,
+            fields="modifiedTime,version"
+        ).execute()
+        return f"drive:{meta.get('version')}:{meta.get('modifiedTime')}"
+    except Exception:
+        return None
+
+# =====================================================
+# LOAD (DOWNLOAD ONLY WHEN CHANGED)
+# =====================================================
+def _load_raw_records(force=False, background=False):
+    """
+    Returns the sheet as a list of dicts (gspread get_all_records()).
+    background=True: poller tick, kept out of the click counters.
+    """
+    creds = _credentials()
+    version = sheet_version(creds)
+
+    with _cache_lock:
+        unchanged = (
+            not force
+            and version is not None
+            and _cache["records"] is not None
+            and version == _cache["version"]
+        )
+        if unchanged:
+            if not background:
+                _cache["skipped"] += 1
+            return _cache["records"]
 
-    SPREADSHEET_ID = "1SpNGsY707CaY6i06knI9F2HJdtAcHxGKq8IjAb17oWo"
+    client = gspread.authorize(creds)
     sheet = client.open_by_key(SPREADSHEET_ID).sheet1
-    
-    data = sheet.get_all_records()
-    return pd.DataFrame(data)
-
-
-
-
 
+    data = sheet.get_all_records()
 
+    with _cache_lock:
+        # Version probed BEFORE download: a change during download
+        # only causes one extra download next time, never stale data.
+        _cache["version"] = version
+        _cache["records"] = data
+        _cache["synced_at"] = time.time()
+        _cache["background_downloads" if background else "downloads"] += 1
+
+    return data
+
+
+def load_form_data(force=False):
+    # pandas only loaded for the DataFrame path (UI)
+    import pandas as pd
+
+    return pd.DataFrame(_load_raw_records(force))
+
+
+def load_form_records(force=False):
+    """
+    Same rows as load_form_data(), as compact IntakeRecords.
+    Pandas-free: meant for batch runs over many rows.
+    """
+    return records_from_dicts(_load_raw_records(force))
+
+
+def sync_status():
+    with _cache_lock:
+        return {
+            "version": _cache["version"],
+            "synced_at": _cache["synced_at"],
+            "downloads": _cache["downloads"],
+            "skipped": _cache["skipped"],
+            "background_downloads": _cache["background_downloads"],
+        }
+
+# =====================================================
+# OPTIONAL BACKGROUND POLLER
+# =====================================================
+def _poll(interval, stop):
+    while not stop.wait(interval):
+        try:
+            # Raw records only: the DataFrame is built when a user fetches
+            _load_raw_records(background=True)
+        except Exception:
+            # Next tick retries; clicks still load on demand
+            pass
+
+
+def start_background_poller(interval=60):
+    """
+    Keeps the cached sheet fresh so "Fetch Latest" is served from memory.
+    Safe to call on every rerun (starts only one thread per process).
+    """
+    global _poller, _poller_stop
+    with _cache_lock:
+        if _poller is None or not _poller.is_alive() or _poller_stop.is_set():
+            _poller_stop = threading.Event()
+            _poller = threading.Thread(
+                target=_poll,
+                args=(interval, _poller_stop),
+                daemon=True,
+                name="sheet-poller"
+            )
+            _poller.start()
+    return _poller
+
+
+def stop_background_poller():
+    """
+    Stops the poller after its current tick (no-op if not running).
+    """
+    global _poller
+    with _cache_lock:
+        if _poller_stop is not None:
+            _poller_stop.set()
+        _poller = None
@@ -0,0 +1,156 @@
+# intake_record.py
+
+import math
+from functools import lru_cache
+
+# =====================================================
+# VALUE NORMALIZATION
+# =====================================================
+def normalize_value(value):
+    """
+    None / NaN → "", everything else → stripped string.
+    Done ONCE when the record is built, not on every lookup.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and math.isnan(value):
+        return ""
+    return str(value).strip()
+
+# =====================================================
+# SCHEMA (SHARED BY ALL ROWS OF ONE SHEET)
+# =====================================================
+class IntakeSchema:
+    __slots__ = ("fields", "positions", "_extended")
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.positions = {f: i for i, f in enumerate(self.fields)}
+        self._extended = {}
+
+    def extend(self, name):
+        # Cached so every row gaining the same column shares one schema
+        if name not in self._extended:
+            self._extended[name] = IntakeSchema(self.fields + (name,))
+        return self._extended[name]
+
+# =====================================================
+# COMPACT ROW
+# =====================================================
+class IntakeRecord:
+    """
+    Tuple-backed intake row with pre-normalized string values.
+
+    Supports the subset of pandas.Series used by the generators:
+    row.index, row[k], row.get(k, default), k in row, row.items(),
+    row.copy() and row[k] = v.
+    """
+
+    __slots__ = ("schema", "values")
+
+    def __init__(self, schema, values):
+        self.schema = schema
+        self.values = tuple(values)
+
+    @property
+    def index(self):
+        return self.schema.fields
+
+    def __getitem__(self, key):
+        return self.values[self.schema.positions[key]]
+
+    def get(self, key, default=None):
+        pos = self.schema.positions.get(key)
+        return default if pos is None else self.values[pos]
+
+    def __contains__(self, key):
+        return key in self.schema.positions
+
+    def __setitem__(self, key, value):
+        value = normalize_value(value)
+        pos = self.schema.positions.get(key)
+        if pos is None:
+            self.schema = self.schema.extend(key)
+            self.values = self.values + (value,)
+        else:
+            self.values = self.values[:pos] + (value,) + self.values[pos + 1:]
+
+    def __len__(self):
+        return len(self.values)
+
+    def items(self):
+        return zip(self.schema.fields, self.values)
+
+    def copy(self):
+        # Values are an immutable tuple → sharing is safe
+        return IntakeRecord(self.schema, self.values)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"IntakeRecord({self.to_dict()!r})"
+
+# =====================================================
+# BUILDERS
+# =====================================================
+def find_job_title_field(fields):
+    for f in fields:
+        if "job" in f.lower() and "title" in f.lower():
+            return f
+    return None
+
+
+def records_from_dicts(rows):
+    """
+    Builds IntakeRecords straight from gspread get_all_records() output.
+    "__job_title__" is filled in up front, as select_row() does for Series.
+    """
+    if not rows:
+        return []
+
+    fields = list(rows[0].keys())
+    job_title_field = find_job_title_field(fields)
+    schema = IntakeSchema(fields + ["__job_title__"])
+
+    records = []
+    for row in rows:
+        values = [normalize_value(row.get(f)) for f in fields]
+        job_title = normalize_value(row.get(job_title_field)) if job_title_field else ""
+        values.append(job_title)
+        records.append(IntakeRecord(schema, values))
+    return records
+
+
+def record_from_series(series):
+    schema = IntakeSchema(list(series.index))
+    return IntakeRecord(schema, [normalize_value(v) for v in series.tolist()])
+
+# =====================================================
+# COLUMN ROLES (CACHED PER SCHEMA)
+# =====================================================
+@lru_cache(maxsize=64)
+def column_roles(fields):
+    """
+    Resolves which columns feed each JD block.
+    fields: tuple of column names (hashable → cached per sheet layout)
+    """
+    header = []
+    for key in fields:
+        lower = key.lower()
+        if "location" in lower:
+            header.append(key)
+        if "employment" in lower:
+            header.append(key)
+        if "work mode" in lower or "workmode" in lower:
+            header.append(key)
+
+    return {
+        "job_title": find_job_title_field(fields),
+        "header": tuple(header),
+        "salary": tuple(k for k in fields if "salary range" in k.lower()),
+        "joining": tuple(
+            k for k in fields
+            if "urgent" in k.lower() or "hire" in k.lower()
+        ),
+    }
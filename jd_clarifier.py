@@ -1,42 +1,93 @@
 from langchain_core.messages import HumanMessage
 import json
 
+from intake_record import column_roles
 
-def generate_role_specific_clarifying_questions(llm, row, draft_jd: str = ""):
-    """
-    Generates high-quality clarifying questions for JD creation
-    by analyzing BOTH:
-    - Excel intake data
-    - Draft Job Description (if provided)
 
-    Questions are asked ONLY where:
-    - Information is missing
-    - Assumptions are made
-    - Excel and JD conflict
-    - JD could be misleading
+# =====================================================
+# OUTPUT PARSERS (ALSO USED AS ROUTER VALIDATORS)
+# =====================================================
+def coerce_title_options(title_options):
     """
+    Raises if the value is not a non-empty list of titles.
+    """
+    if not isinstance(title_options, list) or not title_options:
+        raise ValueError("Expected a non-empty JSON array of titles")
+    return [str(t) for t in title_options][:6]
 
-    # ----------------------------
-    # Resolve Job Title
-    # ----------------------------
-    job_title = "This role"
-    for k in row.index:
-        if "job" in k.lower() and "title" in k.lower():
-            job_title = str(row[k]).strip()
-            break
 
-    # ----------------------------
-    # Raw form context (Excel)
-    # ----------------------------
-    form_context = "\n".join(
-        f"{k}: {row[k]}" for k in row.index if str(row[k]).strip()
+def parse_title_options(content):
+    return coerce_title_options(json.loads(content.strip()))
+
+
+def parse_questions(content):
+    parsed = json.loads(content.strip())
+    if not isinstance(parsed, list):
+        raise ValueError("Expected a JSON array of questions")
+    return parsed
+
+
+# =====================================================
+# ROW CONTEXT
+# =====================================================
+def resolve_job_title(row):
+    job_title_col = column_roles(tuple(row.index))["job_title"]
+    if job_title_col is None:
+        return "This role"
+    return str(row[job_title_col]).strip()
+
+
+def build_form_context(row):
+    # items() → no per-key index lookups (Series or IntakeRecord)
+    return "\n".join(
+        f"{k}: {v}" for k, v in row.items() if str(v).strip()
     )
 
+# =====================================================
+# QUESTION BUILDERS (SHARED WITH jd_structured.py)
+# =====================================================
+def build_title_question(title_options):
+    if not title_options:
+        return None
+    return {
+        "question": "Please select the most appropriate job title, if you would like to redefine it.",
+        "options": list(title_options) + ["None of the above (keep current title)"]
+    }
+
+
+BANNED_KEYWORDS = [
+    "repair", "spare", "inventory", "fix rate",
+    "certification", "expert level", "years of experience"
+]
+
+
+def filter_questions(parsed):
+    """
+    Keeps well-formed multiple-choice questions (3–4 options)
+    that avoid banned topics.
+    """
+    def is_high_quality_question(q):
+        text = q["question"].lower()
+        return not any(b in text for b in BANNED_KEYWORDS)
+
     questions = []
+    if isinstance(parsed, list):
+        for q in parsed:
+            if (
+                isinstance(q, dict)
+                and isinstance(q.get("question"), str)
+                and isinstance(q.get("options"), list)
+                and 3 <= len(q["options"]) <= 4
+                and is_high_quality_question(q)
+            ):
+                questions.append(q)
+    return questions
 
-    # =====================================================
-    # 1️⃣ FIXED QUESTION — JOB TITLE REFINEMENT
-    # =====================================================
+
+# =====================================================
+# JOB TITLE ALTERNATIVES (PER ROW)
+# =====================================================
+def generate_title_alternatives(llm, job_title, force=False):
     title_prompt = f"""
 You are a senior hiring manager expert.
 
@@ -55,20 +106,166 @@ Rules:
 - Output ONLY a valid JSON array of strings
 """
 
-    title_response = llm.invoke([HumanMessage(content=title_prompt)])
+    title_response = llm.invoke(
+        [HumanMessage(content=title_prompt)],
+        prompt_type="title_alternatives",
+        validate=parse_title_options,
+        force=force
+    )
 
     try:
-        title_options = json.loads(title_response.content.strip())
-        title_options = [str(t) for t in title_options][:6]
+        return parse_title_options(title_response.content)
     except Exception:
-        title_options = []
+        return []
+
+# =====================================================
+# JOB TITLE ALTERNATIVES (BATCHED ACROSS ROWS)
+# =====================================================
+# Titles per request, and a prompt-size cap for long titles
+TITLE_BATCH_SIZE = 10
+TITLE_BATCH_MAX_SIZE = 20
+TITLE_BATCH_MAX_CHARS = 2000
+
+# Output tokens per title in a batch answer: the key, 5–6 alternatives
+# and JSON punctuation come to ~55–70 tokens; the rest is headroom
+TITLE_BATCH_TOKENS_PER_TITLE = 90
+
 
-    if title_options:
-        title_options.append("None of the above (keep current title)")
-        questions.append({
-            "question": "Please select the most appropriate job title, if you would like to redefine it.",
-            "options": title_options
-        })
+def title_batch_size(llm):
+    """
+    Titles per request that fit the max_tokens of the tier the batch
+    is routed to. A truncated answer fails parse_title_batch and the
+    router resends the whole batch to the large tier.
+    Falls back to TITLE_BATCH_SIZE for clients without tiers.
+    """
+    try:
+        max_tokens = llm.tiers[llm.tier_for("title_alternatives_batch")]["max_tokens"]
+        size = int(max_tokens) // TITLE_BATCH_TOKENS_PER_TITLE
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return TITLE_BATCH_SIZE
+    return max(1, min(size, TITLE_BATCH_MAX_SIZE))
+
+
+def _title_chunks(job_titles, chunk_size, max_chars):
+    chunk, size = [], 0
+    for title in job_titles:
+        if chunk and (len(chunk) >= chunk_size or size + len(title) > max_chars):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(title)
+        size += len(title)
+    if chunk:
+        yield chunk
+
+
+def parse_title_batch(content):
+    parsed = json.loads(content.strip())
+    if not isinstance(parsed, dict):
+        raise ValueError("Expected a JSON object of title → alternatives")
+    return parsed
+
+
+def generate_title_alternatives_batch(llm, job_titles, chunk_size=None,
+                                      max_chars=TITLE_BATCH_MAX_CHARS, force=False):
+    """
+    Title alternatives for MANY rows with one request per chunk
+    (chunk_size defaults to title_batch_size(llm)).
+
+    Returns {job_title: [alternatives]} for every input title.
+    Titles missing or malformed in the batch answer fall back
+    to the per-row prompt.
+    """
+    unique_titles = list(dict.fromkeys(t for t in job_titles if t))
+    chunk_size = chunk_size or title_batch_size(llm)
+    results = {}
+
+    for chunk in _title_chunks(unique_titles, chunk_size, max_chars):
+        batch_prompt = f"""
+You are a senior hiring manager expert.
+
+For EACH current job title below, propose 5–6 alternative job titles that would:
+- Better reflect actual ownership and execution
+- Be suitable for job portals (LinkedIn, Naukri)
+- Reduce ambiguity for candidates
+Rules:
+- Keep the same role meaning
+- Improve clarity and professionalism
+- Use Title Case
+
+Current job titles (JSON array):
+{json.dumps(chunk, ensure_ascii=False)}
+
+Output ONLY a valid JSON object.
+Keys: every current job title EXACTLY as given.
+Values: JSON array of alternative titles (strings).
+"""
+
+        try:
+            response = llm.invoke(
+                [HumanMessage(content=batch_prompt)],
+                prompt_type="title_alternatives_batch",
+                validate=parse_title_batch,
+                force=force
+            )
+            parsed = parse_title_batch(response.content)
+        except Exception:
+            parsed = {}
+
+        for title in chunk:
+            try:
+                results[title] = coerce_title_options(parsed.get(title))
+            except ValueError:
+                pass
+
+    # Per-item fallback for anything the batch didn't answer
+    for title in unique_titles:
+        if title not in results:
+            results[title] = generate_title_alternatives(llm, title, force=force)
+
+    return results
+
+
+def generate_role_specific_clarifying_questions(llm, row, draft_jd: str = "", title_options=None,
+                                               force=False):
+    """
+    Generates high-quality clarifying questions for JD creation
+    by analyzing BOTH:
+    - Excel intake data
+    - Draft Job Description (if provided)
+
+    Questions are asked ONLY where:
+    - Information is missing
+    - Assumptions are made
+    - Excel and JD conflict
+    - JD could be misleading
+
+    llm: ModelRouter (see llm_router.py)
+    title_options: precomputed title alternatives (skips the title call)
+    force: regeneration → no sharing of in-flight LLM results
+    """
+
+    # ----------------------------
+    # Resolve Job Title
+    # ----------------------------
+    job_title = resolve_job_title(row)
+
+    # ----------------------------
+    # Raw form context (Excel)
+    # ----------------------------
+    form_context = build_form_context(row)
+
+    questions = []
+
+    # =====================================================
+    # 1️⃣ FIXED QUESTION — JOB TITLE REFINEMENT
+    # =====================================================
+    # Batch runs pass title_options computed for many rows at once
+    if title_options is None:
+        title_options = generate_title_alternatives(llm, job_title, force=force)
+
+    title_question = build_title_question(title_options)
+    if title_question:
+        questions.append(title_question)
 
     # =====================================================
     # 2️⃣ EXCEL + DRAFT JD GAP ANALYSIS (KEY CHANGE)
@@ -152,35 +349,22 @@ FORMAT:
 ]
 """
 
-    response = llm.invoke([HumanMessage(content=dynamic_prompt)])
+    response = llm.invoke(
+        [HumanMessage(content=dynamic_prompt)],
+        prompt_type="gap_questions",
+        validate=parse_questions,
+        force=force
+    )
 
     try:
-        parsed = json.loads(response.content.strip())
+        parsed = parse_questions(response.content)
     except Exception:
         parsed = []
 
     # =====================================================
     # 3️⃣ QUALITY FILTER (UNCHANGED, STILL IMPORTANT)
     # =====================================================
-    banned_keywords = [
-        "repair", "spare", "inventory", "fix rate",
-        "certification", "expert level", "years of experience"
-    ]
-
-    def is_high_quality_question(q):
-        text = q["question"].lower()
-        return not any(b in text for b in banned_keywords)
-
-    if isinstance(parsed, list):
-        for q in parsed:
-            if (
-                isinstance(q, dict)
-                and isinstance(q.get("question"), str)
-                and isinstance(q.get("options"), list)
-                and 3 <= len(q["options"]) <= 4
-                and is_high_quality_question(q)
-            ):
-                questions.append(q)
+    questions.extend(filter_questions(parsed))
 
     return questions
 
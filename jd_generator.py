@@ -5,10 +5,12 @@ from datetime import datetime
 from docx import Document
 from docx.shared import Pt
 from docx.oxml.ns import qn
-from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage
 import streamlit as st
 
+from intake_record import column_roles
+from llm_router import get_router
+
 # =====================================================
 # FONT SIZES
 # =====================================================
@@ -24,11 +26,7 @@ try:
 except KeyError:
     raise RuntimeError("GROQ_API_KEY not found in Streamlit Secrets")
 
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0,
-    api_key=GROQ_API_KEY
-)
+llm = get_router(GROQ_API_KEY)
 
 # =====================================================
 # TITLE CASE HELPER
@@ -111,19 +109,18 @@ def add_ctc_and_joining(doc, row):
     salary = None
     joining = None
 
-    for col in row.index:
-        col_lower = col.lower()
-        value = str(row[col]).strip()
-
-        if not value:
-            continue
+    roles = column_roles(tuple(row.index))
 
-        # Salary column
-        if "salary range" in col_lower:
+    # Salary column (last non-empty wins)
+    for col in roles["salary"]:
+        value = str(row[col]).strip()
+        if value:
             salary = value
 
-        # Urgency / joining column
-        if "urgent" in col_lower or "hire" in col_lower:
+    # Urgency / joining column (last non-empty wins)
+    for col in roles["joining"]:
+        value = str(row[col]).strip()
+        if value:
             joining = value
 
     add_heading(doc, "Compensation & Joining")
@@ -142,15 +139,7 @@ def add_ctc_and_joining(doc, row):
 # HEADER BLOCK
 # =====================================================
 def build_header_block(row):
-    parts = []
-
-    for key in row.index:
-        if "location" in key.lower():
-            parts.append(row[key])
-        if "employment" in key.lower():
-            parts.append(row[key])
-        if "work mode" in key.lower() or "workmode" in key.lower():
-            parts.append(row[key])
+    parts = [row[key] for key in column_roles(tuple(row.index))["header"]]
 
     travel = row.get("Does this role require travel?", "").strip()
     if travel:
@@ -175,20 +164,34 @@ def sanitize_clarifications(clarifications):
             sanitized[question] = answer
     return sanitized
 
+# =====================================================
+# PROMPT INPUTS (SHARED WITH jd_structured.py)
+# =====================================================
+def resolve_jd_title(row):
+    job_title_col = column_roles(tuple(row.index))["job_title"]
+    return to_title_case(row.get(job_title_col, ""))
+
+
+def build_input_data(row):
+    return (
+        f"Job Title: {row.get('Job Title','')}\n"
+        f"Core Responsibility: {row.get('What is the single core responsibility of this role?','')}\n"
+        f"Key Responsibilities: {row.get('Key Responsibilities','')}\n"
+        f"Top Skills: {row.get('Top 3 skills this role MUST have','')}\n"
+        f"Minimum Education: {row.get('Minimum education required','')}\n"
+        f"Minimum Experience: {row.get('Minimum experience required','')}\n"
+        f"Other Skills: {row.get('other skills','')}"
+    )
+
 # =====================================================
 # CORE JD GENERATION
 # =====================================================
-def generate_ranked_jd(row, clarifications=None):
+def generate_ranked_jd(row, clarifications=None, force=False):
 
     clarifications = clarifications or {}
     clarifications = sanitize_clarifications(clarifications)
 
-    job_title_col = next(
-        (k for k in row.index if "job" in k.lower() and "title" in k.lower()),
-        None
-    )
-
-    job_title = to_title_case(row.get(job_title_col, ""))
+    job_title = resolve_jd_title(row)
     clarification_text = ""
     if clarifications:
         clarification_text = "\n".join(
@@ -260,16 +263,14 @@ inside the most relevant sections above:
 INPUT DATA
 =====================
 
-Job Title: {row.get('Job Title','')}
-Core Responsibility: {row.get('What is the single core responsibility of this role?','')}
-Key Responsibilities: {row.get('Key Responsibilities','')}
-Top Skills: {row.get('Top 3 skills this role MUST have','')}
-Minimum Education: {row.get('Minimum education required','')}
-Minimum Experience: {row.get('Minimum experience required','')}
-Other Skills: {row.get('other skills','')}
+{build_input_data(row)}
 """
 
-    response = llm.invoke([HumanMessage(content=prompt)])
+    response = llm.invoke(
+        [HumanMessage(content=prompt)],
+        prompt_type="final_jd" if clarifications else "draft_jd",
+        force=force
+    )
     return response.content.strip()
     
 def clean_llm_output(jd_text: str) -> list[str]:
@@ -0,0 +1,149 @@
+# jd_pipeline.py
+
+from io import BytesIO
+
+from jd_generator import generate_ranked_jd, write_jd_to_docx
+from jd_clarifier import (
+    generate_role_specific_clarifying_questions,
+    generate_title_alternatives_batch,
+    resolve_job_title,
+)
+from jd_structured import generate_structured_bundle
+from jd_store import get_store
+
+# Step 1 generation modes
+MODE_MULTI = "multi"      # draft JD, titles, questions → 3 calls
+MODE_SINGLE = "single"    # one structured JSON call
+
+# =====================================================
+# ROW SELECTION
+# =====================================================
+def index_labels(df):
+    """
+    {label: position of its FIRST row}, built once per sheet load
+    so selecting a role doesn't scan the whole DataFrame.
+    """
+    positions = {}
+    for pos, label in enumerate(df["JD_Label"].tolist()):
+        positions.setdefault(label, pos)
+    return positions
+
+
+def select_row(df, label, job_title_col, positions=None):
+    if positions is not None:
+        row = df.iloc[positions[label]].copy()
+    else:
+        row = df[df["JD_Label"] == label].iloc[0].copy()
+
+    # Persist original job title
+    row["__job_title__"] = row[job_title_col]
+    return row
+
+# =====================================================
+# STEP 1: DRAFT JD + CLARIFYING QUESTIONS
+# =====================================================
+def generate_multi_call(llm, row, title_options=None, force=False):
+    draft_jd = generate_ranked_jd(row, force=force)
+
+    # Gap analysis compares the intake data WITH the draft
+    questions = generate_role_specific_clarifying_questions(
+        llm, row, draft_jd=draft_jd, title_options=title_options, force=force
+    )
+
+    return {
+        "draft_jd": draft_jd,
+        "questions": questions,
+    }
+
+
+def generate_draft_bundle(llm, row, force=False, mode=MODE_MULTI, title_options=None):
+    """
+    Unchanged rows are served from the JD store.
+    force=True regenerates (never sharing an in-flight LLM result)
+    and stores a new version.
+
+    mode=MODE_SINGLE asks for everything in one structured call
+    and falls back to the multi-call path if the response is invalid.
+
+    title_options: precomputed by a batched title call (multi-call path)
+
+    The bundle's "llm_calls" is the number of LLM requests it cost
+    (0 when served from the store).
+    """
+    store = get_store()
+
+    if not force:
+        cached = store.get_draft(row)
+        if cached is not None:
+            cached["llm_calls"] = 0
+            return cached
+
+    bundle = None
+    llm_calls = 0
+    if mode == MODE_SINGLE:
+        llm_calls += 1
+        try:
+            bundle = generate_structured_bundle(llm, row, force=force)
+        except Exception:
+            bundle = None
+
+    if bundle is None:
+        bundle = generate_multi_call(llm, row, title_options=title_options, force=force)
+        # Draft JD + questions, + titles unless precomputed
+        llm_calls += 2 if title_options is not None else 3
+
+    store.save_draft(row, bundle["draft_jd"], bundle["questions"])
+    bundle["llm_calls"] = llm_calls
+    return bundle
+
+
+def generate_draft_bundles(llm, rows, force=False, mode=MODE_MULTI):
+    """
+    Step 1 for a backlog of rows.
+    Title alternatives for all rows that need generating are fetched
+    in batched requests instead of one request per row.
+    """
+    store = get_store()
+    pending = [r for r in rows if force or not store.has_draft(r)]
+
+    titles = {}
+    if mode == MODE_MULTI and pending:
+        titles = generate_title_alternatives_batch(
+            llm, [resolve_job_title(r) for r in pending], force=force
+        )
+
+    return [
+        generate_draft_bundle(
+            llm, row, force=force, mode=mode,
+            title_options=titles.get(resolve_job_title(row))
+        )
+        for row in rows
+    ]
+
+# =====================================================
+# STEP 3: FINAL JD + DOCX
+# =====================================================
+def generate_final_jd(row, answers, force=False):
+    """
+    Returns {"final_jd": str, "docx": bytes}.
+    Same row + same answers → served from the JD store.
+    """
+    store = get_store()
+
+    if not force:
+        cached = store.get_final(row, answers)
+        if cached is not None:
+            return cached
+
+    final_jd = generate_ranked_jd(row, clarifications=answers, force=force)
+
+    buffer = BytesIO()
+    write_jd_to_docx(final_jd, row).save(buffer)
+    docx = buffer.getvalue()
+
+    store.save_final(row, answers, final_jd, docx)
+
+    return {
+        "final_jd": final_jd,
+        "docx": docx,
+    }
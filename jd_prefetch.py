@@ -0,0 +1,192 @@
+# jd_prefetch.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from jd_clarifier import (
+    generate_title_alternatives_batch,
+    resolve_job_title,
+    title_batch_size,
+)
+from jd_pipeline import MODE_MULTI, generate_draft_bundle
+
+# =====================================================
+# SPECULATIVE PREFETCHER
+# =====================================================
+class SpeculativePrefetcher:
+    """
+    Starts Step 1 (draft JD + clarifying questions) in the background
+    as soon as a role is selected, before the button is pressed.
+
+    - take() attaches to an in-flight or finished result
+    - If nothing was prefetched, take() generates inline as before
+    - Speculative work is capped at max_speculative requests budget:
+      one per bundle, one per batched title request
+    """
+
+    def __init__(self, llm, max_workers=2, max_speculative=10, mode=MODE_MULTI):
+        self.llm = llm
+        self.max_speculative = max_speculative
+        self.mode = mode
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="jd-prefetch"
+        )
+        self._futures = {}
+        self._taken = set()
+        # Speculation dropped by a forced regeneration
+        self._discarded = []
+        # Batched title requests from warm(): (future, keys, requests)
+        self._title_batches = []
+        # Keys whose speculative bundle was used
+        self._used = set()
+        self._lock = threading.Lock()
+
+        self._speculated = 0
+        self._hits = 0
+        self._misses = 0
+        self._failed = 0
+        self._skipped_budget = 0
+
+    # ----------------------------
+    # Start speculative work
+    # ----------------------------
+    def _bundle(self, row, titles_future=None):
+        title_options = None
+        if titles_future is not None:
+            try:
+                title_options = titles_future.result().get(resolve_job_title(row))
+            except Exception:
+                title_options = None
+        return generate_draft_bundle(
+            self.llm, row, mode=self.mode, title_options=title_options
+        )
+
+    def prefetch(self, key, row, titles_future=None):
+        with self._lock:
+            if key in self._futures or key in self._taken:
+                return True
+
+            if self._speculated >= self.max_speculative:
+                self._skipped_budget += 1
+                return False
+
+            self._speculated += 1
+            self._futures[key] = self._executor.submit(
+                self._bundle, row, titles_future
+            )
+        return True
+
+    def warm(self, keyed_rows, limit):
+        """
+        Prefetches the first `limit` rows that were not processed yet.
+        keyed_rows: iterable of (key, row)
+
+        Title alternatives for the warmed rows share batched requests.
+        """
+        with self._lock:
+            budget = max(self.max_speculative - self._speculated, 0)
+            seen = set(self._futures) | self._taken
+
+        selected = []
+        for key, row in keyed_rows:
+            if len(selected) >= min(limit, budget):
+                break
+            if key not in seen:
+                selected.append((key, row))
+                seen.add(key)
+
+        titles_future = None
+        if self.mode == MODE_MULTI and len(selected) > 1:
+            # The title batch shares the budget with the bundles it feeds
+            chunk_size = title_batch_size(self.llm)
+            requests = -(-len(selected) // chunk_size)
+            while len(selected) > 2 and len(selected) + requests > budget:
+                selected.pop()
+                requests = -(-len(selected) // chunk_size)
+
+            if len(selected) + requests <= budget:
+                with self._lock:
+                    self._speculated += requests
+                    # Submitted first → already running before any bundle waits on it
+                    titles_future = self._executor.submit(
+                        generate_title_alternatives_batch,
+                        self.llm,
+                        [resolve_job_title(row) for _, row in selected],
+                        chunk_size
+                    )
+                    self._title_batches.append(
+                        (titles_future, {key for key, _ in selected}, requests)
+                    )
+
+        started = 0
+        for key, row in selected:
+            if not self.prefetch(key, row, titles_future):
+                break
+            started += 1
+        return started
+
+    # ----------------------------
+    # Consume (button press)
+    # ----------------------------
+    def take(self, key, row, force=False):
+        with self._lock:
+            future = self._futures.pop(key, None)
+            self._taken.add(key)
+            if future is not None and force:
+                self._discarded.append(future)
+
+        # Forced regeneration never reuses speculative work
+        if future is not None and not force:
+            try:
+                result = future.result()
+            except Exception:
+                # Failed speculation → fall through to a normal call
+                with self._lock:
+                    self._failed += 1
+            else:
+                with self._lock:
+                    self._hits += 1
+                    self._used.add(key)
+                return result
+
+        with self._lock:
+            self._misses += 1
+        return generate_draft_bundle(self.llm, row, force=force, mode=self.mode)
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def metrics(self):
+        with self._lock:
+            requests = self._hits + self._misses
+            in_flight = sum(1 for f in self._futures.values() if not f.done())
+
+            # Finished but never used; bundles served from the store cost nothing
+            wasted_calls = sum(
+                f.result()["llm_calls"]
+                for f in list(self._futures.values()) + self._discarded
+                if f.done() and not f.cancelled() and f.exception() is None
+            )
+
+            # A title batch is wasted once none of its rows can still use it
+            for future, keys, batch_requests in self._title_batches:
+                pending = any(
+                    key in self._futures and not self._futures[key].done()
+                    for key in keys
+                )
+                if future.done() and not pending and not keys & self._used:
+                    wasted_calls += batch_requests
+
+            return {
+                "speculated": self._speculated,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / requests if requests else 0.0,
+                "in_flight": in_flight,
+                "failed": self._failed,
+                "skipped_budget": self._skipped_budget,
+                "budget_left": max(self.max_speculative - self._speculated, 0),
+                "wasted_calls": wasted_calls,
+            }
@@ -0,0 +1,225 @@
+# jd_store.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from intake_record import column_roles
+
+# =====================================================
+# STORE LOCATION
+# =====================================================
+STORE_PATH = os.path.join("output", "jd_store.sqlite3")
+
+# Columns added by the app, not part of the intake row
+INTERNAL_COLUMNS = {"JD_Label", "__job_title__"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jd_versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    row_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    job_title TEXT,
+    jd_text TEXT NOT NULL,
+    questions TEXT,
+    answers TEXT,
+    docx BLOB,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jd_versions_fp ON jd_versions(kind, fingerprint);
+CREATE INDEX IF NOT EXISTS idx_jd_versions_row ON jd_versions(row_id, kind, version);
+"""
+
+# =====================================================
+# NORMALIZATION + FINGERPRINTS
+# =====================================================
+def _normalize(value):
+    text = "" if value is None else str(value)
+    if text.lower() == "nan":
+        return ""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def normalized_row(row):
+    return {
+        _normalize(k): _normalize(v)
+        for k, v in row.items()
+        if k not in INTERNAL_COLUMNS
+    }
+
+
+def _digest(payload):
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def row_fingerprint(row, clarifications=None):
+    """
+    Stable hash of the normalized row content (+ clarifications).
+    Whitespace-only edits and column order do NOT change it.
+    """
+    payload = {"row": normalized_row(row)}
+    if clarifications:
+        payload["clarifications"] = {
+            _normalize(q): _normalize(a) for q, a in clarifications.items()
+        }
+    return _digest(payload)
+
+
+def row_identity(row):
+    """
+    Identifies the form response itself (survives edits),
+    so every regeneration becomes a new version of the same row.
+    """
+    fields = normalized_row(row)
+    identity = {
+        k: v for k, v in fields.items()
+        if k.lower() == "timestamp" or ("job" in k.lower() and "title" in k.lower())
+    }
+    return _digest(identity or fields)
+
+
+def _job_title(row):
+    job_title_col = column_roles(tuple(row.index))["job_title"]
+    return _normalize(row[job_title_col]) if job_title_col else ""
+
+# =====================================================
+# STORE
+# =====================================================
+class JDStore:
+    """
+    Local SQLite store of generated JDs with version history.
+
+    - kind="draft": draft JD + clarifying questions, keyed by row fingerprint
+    - kind="final": final JD + answers + DOCX bytes, keyed by row + answers
+    """
+
+    def __init__(self, path=None):
+        # Resolved at call time so STORE_PATH can be changed at runtime
+        self.path = path or STORE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation → safe across threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ----------------------------
+    # Internal helpers
+    # ----------------------------
+    def _latest(self, kind, fingerprint):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT * FROM jd_versions WHERE kind = ? AND fingerprint = ? "
+                "ORDER BY id DESC LIMIT 1",
+                (kind, fingerprint)
+            ).fetchone()
+
+    def _insert(self, row, kind, fingerprint, jd_text, questions=None,
+                answers=None, docx=None):
+        row_id = row_identity(row)
+        with self._connect() as conn:
+            # Lock before reading MAX(version) so concurrent writers don't collide
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) + 1 FROM jd_versions "
+                "WHERE row_id = ? AND kind = ?",
+                (row_id, kind)
+            ).fetchone()[0]
+
+            conn.execute(
+                "INSERT INTO jd_versions (row_id, kind, version, fingerprint, "
+                "job_title, jd_text, questions, answers, docx, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    row_id, kind, version, fingerprint, _job_title(row), jd_text,
+                    json.dumps(questions) if questions is not None else None,
+                    json.dumps(answers) if answers is not None else None,
+                    docx,
+                    datetime.now().isoformat(timespec="seconds"),
+                )
+            )
+        return version
+
+    # ----------------------------
+    # Drafts
+    # ----------------------------
+    def get_draft(self, row):
+        record = self._latest("draft", row_fingerprint(row))
+        if record is None:
+            return None
+        return {
+            "draft_jd": record["jd_text"],
+            "questions": json.loads(record["questions"] or "[]"),
+        }
+
+    def has_draft(self, row):
+        return self._latest("draft", row_fingerprint(row)) is not None
+
+    def save_draft(self, row, draft_jd, questions):
+        return self._insert(
+            row, "draft", row_fingerprint(row), draft_jd, questions=questions
+        )
+
+    # ----------------------------
+    # Finals
+    # ----------------------------
+    def get_final(self, row, answers):
+        record = self._latest("final", row_fingerprint(row, answers))
+        if record is None:
+            return None
+        return {
+            "final_jd": record["jd_text"],
+            "docx": record["docx"],
+        }
+
+    def save_final(self, row, answers, final_jd, docx):
+        return self._insert(
+            row, "final", row_fingerprint(row, answers), final_jd,
+            answers=answers, docx=docx
+        )
+
+    # ----------------------------
+    # Version history
+    # ----------------------------
+    def history(self, row):
+        with self._connect() as conn:
+            records = conn.execute(
+                "SELECT kind, version, fingerprint, job_title, created_at "
+                "FROM jd_versions WHERE row_id = ? ORDER BY id DESC",
+                (row_identity(row),)
+            ).fetchall()
+        return [dict(r) for r in records]
+
+# =====================================================
+# SHARED STORE (ONE PER PROCESS)
+# =====================================================
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JDStore()
+        return _store
@@ -0,0 +1,190 @@
+# jd_structured.py
+
+import json
+
+from langchain_core.messages import HumanMessage
+
+from jd_generator import ABOUT_WOGOM_TEXT, build_input_data, resolve_jd_title
+from jd_clarifier import build_form_context, build_title_question, filter_questions
+
+# =====================================================
+# EXPECTED RESPONSE SCHEMA
+# =====================================================
+# Draft sections are rendered back into the same plain-text layout
+# generate_ranked_jd() produces, so write_jd_to_docx() is unchanged.
+DRAFT_LIST_FIELDS = ("responsibilities", "must_have_skills", "preferred_skills")
+DRAFT_TEXT_FIELDS = ("role_overview", "execution_summary", "who_will_succeed")
+
+
+def parse_structured_bundle(content):
+    """
+    Validates the single-call JSON response.
+    Raises ValueError on any schema mismatch (→ router / caller fallback).
+    """
+    data = json.loads(content.strip())
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+
+    draft = data.get("draft")
+    if not isinstance(draft, dict):
+        raise ValueError("Missing 'draft' object")
+
+    for field in DRAFT_TEXT_FIELDS:
+        if not isinstance(draft.get(field), str) or not draft[field].strip():
+            raise ValueError(f"draft.{field} must be a non-empty string")
+
+    for field in DRAFT_LIST_FIELDS:
+        values = draft.get(field)
+        if (
+            not isinstance(values, list)
+            or not values
+            or not all(isinstance(v, str) and v.strip() for v in values)
+        ):
+            raise ValueError(f"draft.{field} must be a non-empty list of strings")
+
+    titles = data.get("title_alternatives")
+    if not isinstance(titles, list) or not all(isinstance(t, str) for t in titles):
+        raise ValueError("title_alternatives must be a list of strings")
+
+    if not isinstance(data.get("questions"), list):
+        raise ValueError("questions must be a list")
+
+    return data
+
+# =====================================================
+# RENDER DRAFT SECTIONS → JD TEXT
+# =====================================================
+def render_draft(draft, job_title):
+    lines = [
+        "Role Title",
+        job_title,
+        "",
+        "About WOGOM",
+        ABOUT_WOGOM_TEXT,
+        "",
+        "Role Overview",
+        draft["role_overview"].strip(),
+        "",
+        "What You'll Do?",
+        draft["execution_summary"].strip(),
+    ]
+    lines += [f"• {r.strip()}" for r in draft["responsibilities"]]
+    lines += [
+        "",
+        "Who’ll Succeed in this Role?",
+        draft["who_will_succeed"].strip(),
+        "",
+        "Must-Have Skills",
+    ]
+    lines += [f"• {s.strip()}" for s in draft["must_have_skills"]]
+    lines += ["", "Preferred Skills"]
+    lines += [f"• {s.strip()}" for s in draft["preferred_skills"]]
+
+    return "\n".join(lines)
+
+# =====================================================
+# SINGLE-CALL GENERATION
+# =====================================================
+def generate_structured_bundle(llm, row, force=False):
+    """
+    Draft JD + title alternatives + clarifying questions in ONE request.
+
+    Returns {"draft_jd": str, "questions": list}
+    Raises if the response does not match the schema.
+    """
+    job_title = resolve_jd_title(row)
+
+    prompt = f"""
+You are a senior hiring manager and HR professional writing for WOGOM.
+
+Produce, in ONE response, three things for the role below:
+1) A draft Job Description
+2) Alternative job titles
+3) Clarifying questions that would MATERIALLY improve the final JD
+
+=====================
+DRAFT JD RULES
+=====================
+- Same tone as a modern operator-led startup JD (execution-focused, crisp, non-generic)
+- Short, confident sentences. No buzzwords, fluff, or corporate clichés
+- Sound like the role owner wrote this JD, not HR
+- role_overview: 2–3 lines. Why the role exists, how value is created,
+  where the impact is felt. NO skills, NO responsibilities
+- execution_summary: 2–3 lines on execution ownership and scope
+- responsibilities: 4–5 items, each a tangible output or action, max 1–2 lines
+- who_will_succeed: 2–3 lines on mindset, working style and ownership.
+  Reflect education and experience naturally. Do NOT list skills
+- must_have_skills / preferred_skills: "Skill – one-line explanation"
+
+=====================
+TITLE RULES
+=====================
+- 5–6 alternatives that better reflect ownership and execution
+- Suitable for job portals (LinkedIn, Naukri), Title Case
+- Keep the same role meaning
+
+=====================
+QUESTION RULES
+=====================
+Compare the intake data with YOUR draft. Ask ONLY where:
+- Information is in the intake data but missing in the draft
+- The draft states something not supported by the intake data
+- The draft makes assumptions
+- Clarity is insufficient or misleading
+- 3–6 questions, one per JD section maximum
+- At least ONE question clarifies role boundaries
+- Multiple-choice only (3–4 realistic options), neutral wording
+- Do NOT invent responsibilities or assume technical, repair,
+  inventory, or product duties unless explicitly stated
+- Do NOT ask about wording only
+
+=====================
+INTAKE DATA
+=====================
+Role Title: {job_title}
+{build_input_data(row)}
+
+All form answers:
+{build_form_context(row)}
+
+=====================
+OUTPUT
+=====================
+Return ONLY one valid JSON object. No explanations. No extra text.
+
+{{
+  "draft": {{
+    "role_overview": "string",
+    "execution_summary": "string",
+    "responsibilities": ["string"],
+    "who_will_succeed": "string",
+    "must_have_skills": ["Skill – one-line explanation"],
+    "preferred_skills": ["Skill – one-line explanation"]
+  }},
+  "title_alternatives": ["string"],
+  "questions": [
+    {{"question": "string", "options": ["string", "string", "string"]}}
+  ]
+}}
+"""
+
+    response = llm.invoke(
+        [HumanMessage(content=prompt)],
+        prompt_type="draft_bundle",
+        validate=parse_structured_bundle,
+        force=force
+    )
+    data = parse_structured_bundle(response.content)
+
+    questions = []
+    title_question = build_title_question(
+        [str(t) for t in data["title_alternatives"]][:6]
+    )
+    if title_question:
+        questions.append(title_question)
+    questions.extend(filter_questions(data["questions"]))
+
+    return {
+        "draft_jd": render_draft(data["draft"], job_title),
+        "questions": questions,
+    }
@@ -0,0 +1,215 @@
+# llm_coalesce.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# =====================================================
+# SETTINGS
+# =====================================================
+COALESCE_PATH = os.path.join("output", "llm_coalesce.sqlite3")
+
+# Lease is renewed while the leader is alive.
+# If the leader process dies, a waiter takes over after this long.
+LEASE_SECONDS = 30
+
+# Published results are only read by callers that waited on that lease;
+# leftovers are cleaned up after this long
+RESULT_TTL_SECONDS = 30
+
+POLL_SECONDS = 0.2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS llm_lease_results (
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (key, owner)
+);
+"""
+
+# =====================================================
+# SINGLE-FLIGHT (CROSS-PROCESS, ONE HOST)
+# =====================================================
+class SingleFlight:
+    """
+    Coalesces identical in-flight work across threads AND processes.
+
+    The first caller for a key takes a lease and runs fn().
+    Concurrent callers with the same key wait and share its result.
+    If the leader fails or dies, the next waiter takes over.
+
+    Only callers that waited on a lease get its result: a call that
+    arrives after the leader finished runs fn() again (no caching).
+    """
+
+    def __init__(self, path=None, lease_seconds=LEASE_SECONDS,
+                 result_ttl=RESULT_TTL_SECONDS, poll_seconds=POLL_SECONDS):
+        self.path = path or COALESCE_PATH
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.poll_seconds = poll_seconds
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._lock = threading.Lock()
+        self._led = 0
+        self._shared = 0
+        self._takeovers = 0
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ----------------------------
+    # Lease handling
+    # ----------------------------
+    def _acquire(self, key, owner):
+        """
+        Returns (acquired, took_over_expired_lease, current_holder).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            lease = conn.execute(
+                "SELECT owner, expires_at FROM llm_leases WHERE key = ?", (key,)
+            ).fetchone()
+
+            if lease is not None and lease[1] > now:
+                return False, False, lease[0]
+
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_leases (key, owner, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, owner, now + self.lease_seconds)
+            )
+            return True, lease is not None, owner
+
+    def _renew(self, key, owner):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE llm_leases SET expires_at = ? WHERE key = ? AND owner = ?",
+                (time.time() + self.lease_seconds, key, owner)
+            )
+
+    def _release(self, key, owner):
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM llm_leases WHERE key = ? AND owner = ?", (key, owner)
+            )
+
+    def _heartbeat(self, key, owner, stop):
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                self._renew(key, owner)
+            except sqlite3.Error:
+                pass
+
+    # ----------------------------
+    # Results
+    # ----------------------------
+    def _result(self, key, leaders):
+        """
+        Result published by one of the leases this caller waited on.
+        """
+        if not leaders:
+            return None
+        marks = ", ".join("?" * len(leaders))
+        with self._connect() as conn:
+            record = conn.execute(
+                f"SELECT payload FROM llm_lease_results "
+                f"WHERE key = ? AND owner IN ({marks})",
+                (key, *leaders)
+            ).fetchone()
+        return json.loads(record[0]) if record else None
+
+    def _publish(self, key, owner, payload):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_lease_results "
+                "(key, owner, payload, created_at) VALUES (?, ?, ?, ?)",
+                (key, owner, json.dumps(payload), now)
+            )
+            conn.execute(
+                "DELETE FROM llm_lease_results WHERE created_at <= ?",
+                (now - self.result_ttl,)
+            )
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    def run(self, key, fn):
+        """
+        fn() must return a JSON-serializable payload.
+        """
+        owner = f"{os.getpid()}-{threading.get_ident()}-{uuid.uuid4().hex[:8]}"
+        # Leases seen while waiting (a takeover changes the holder)
+        leaders = set()
+
+        while True:
+            payload = self._result(key, leaders)
+            if payload is None:
+                acquired, took_over, holder = self._acquire(key, owner)
+                if not acquired:
+                    leaders.add(holder)
+                    time.sleep(self.poll_seconds)
+                    continue
+
+                # The leader may have published between our two reads
+                payload = self._result(key, leaders)
+                if payload is None:
+                    break
+                self._release(key, owner)
+
+            with self._lock:
+                self._shared += 1
+            return payload
+
+        with self._lock:
+            self._led += 1
+            self._takeovers += int(took_over)
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(key, owner, stop), daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            payload = fn()
+            self._publish(key, owner, payload)
+            return payload
+        finally:
+            stop.set()
+            # Failed leader → lease released, next waiter retries
+            self._release(key, owner)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "led": self._led,
+                "shared": self._shared,
+                "takeovers": self._takeovers,
+            }
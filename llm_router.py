@@ -0,0 +1,417 @@
+# llm_router.py
+
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from langchain_core.messages import AIMessage
+from langchain_groq import ChatGroq
+import streamlit as st
+
+from llm_coalesce import SingleFlight
+
+# =====================================================
+# MODEL TIERS
+# =====================================================
+# Overridable from Streamlit Secrets:
+#
+# [llm_routing.tiers.fast]
+# model = "llama-3.1-8b-instant"
+# timeout = 15
+# max_tokens = 1024
+#
+# [llm_routing.routes]
+# title_alternatives = "fast"
+MODEL_TIERS = {
+    "fast": {
+        "model": "llama-3.1-8b-instant",
+        "timeout": 15,
+        # Also sizes batched title requests (jd_clarifier.title_batch_size)
+        "max_tokens": 1024,
+    },
+    "large": {
+        "model": "llama-3.3-70b-versatile",
+        "timeout": 60,
+        "max_tokens": 2048,
+    },
+}
+
+# Largest tier: used for unknown prompt types and as fallback
+FALLBACK_TIER = "large"
+
+# =====================================================
+# PROMPT TYPE → TIER
+# =====================================================
+PROMPT_ROUTES = {
+    "title_alternatives": "fast",
+    "title_alternatives_batch": "fast",
+    "gap_questions": "large",
+    "draft_jd": "large",
+    "final_jd": "large",
+    "draft_bundle": "large",
+}
+
+# =====================================================
+# REQUEST HEDGING (OPT-IN)
+# =====================================================
+# [llm_routing.hedging]
+# enabled = true
+#
+# If a call is still running after the tier's observed p95 latency,
+# an identical duplicate is sent and the first response wins.
+# Only used at temperature 0 (idempotent prompts).
+HEDGING = {
+    "enabled": False,
+    "percentile": 95,
+    # Below this many samples, initial_threshold (seconds) is used
+    "min_samples": 20,
+    "initial_threshold": 10.0,
+    # Hedges per request, per tier
+    "max_hedge_rate": 0.1,
+}
+
+# Backups only (at most max_hedge_rate of requests); primaries never queue
+HEDGE_WORKERS = 16
+
+# Latency samples kept per tier
+LATENCY_WINDOW = 500
+
+# =====================================================
+# PERCENTILE HELPER
+# =====================================================
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[idx]
+
+# =====================================================
+# TOKEN USAGE
+# =====================================================
+def token_usage(response):
+    """
+    Returns (prompt_tokens, completion_tokens) from a LangChain message.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage", {})
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+# =====================================================
+# ROUTER
+# =====================================================
+class ModelRouter:
+    """
+    Sends each prompt type to its configured model tier.
+
+    If a smaller tier fails (timeout, API error) or its output
+    does not pass `validate`, the prompt is re-sent to FALLBACK_TIER.
+
+    With a coalescer, identical prompts in flight at the same time
+    (any thread or process on this host) share a single call.
+
+    With hedging enabled, a slow call gets one duplicate after an
+    adaptive threshold; the first response wins.
+    """
+
+    def __init__(self, api_key=None, tiers=None, routes=None, temperature=0,
+                 coalescer=None, hedging=None):
+        self.api_key = api_key
+        self.temperature = temperature
+        self.coalescer = coalescer
+        self.tiers = {name: dict(cfg) for name, cfg in (tiers or MODEL_TIERS).items()}
+        self.routes = dict(routes or PROMPT_ROUTES)
+        self.hedging = dict(HEDGING, **(hedging or {}))
+
+        self._llms = {}
+        self._lock = threading.Lock()
+        self._stats = {name: self._empty_stats() for name in self.tiers}
+        self._hedge_pool = None
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "requests": 0,
+            "calls": 0,
+            "errors": 0,
+            "fallbacks": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "hedge_wasted_tokens": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            # Per attempt (drives the hedge threshold)
+            "latencies": deque(maxlen=LATENCY_WINDOW),
+            # Per request as seen by the caller (incl. hedging)
+            "request_latencies": deque(maxlen=LATENCY_WINDOW),
+        }
+
+    # ----------------------------
+    # Tier clients (lazy)
+    # ----------------------------
+    def _llm(self, tier):
+        with self._lock:
+            if tier not in self._llms:
+                cfg = self.tiers[tier]
+                self._llms[tier] = ChatGroq(
+                    model=cfg["model"],
+                    temperature=self.temperature,
+                    timeout=cfg.get("timeout"),
+                    max_tokens=cfg.get("max_tokens"),
+                    max_retries=1,
+                    api_key=self.api_key,
+                )
+            return self._llms[tier]
+
+    def tier_for(self, prompt_type):
+        tier = self.routes.get(prompt_type, FALLBACK_TIER)
+        return tier if tier in self.tiers else FALLBACK_TIER
+
+    # ----------------------------
+    # Single attempt (+ metrics)
+    # ----------------------------
+    def _attempt(self, tier, messages):
+        start = time.perf_counter()
+        try:
+            response = self._llm(tier).invoke(messages)
+        except Exception:
+            with self._lock:
+                self._stats[tier]["errors"] += 1
+            raise
+
+        elapsed = time.perf_counter() - start
+        prompt_tokens, completion_tokens = token_usage(response)
+
+        with self._lock:
+            stats = self._stats[tier]
+            stats["calls"] += 1
+            stats["latencies"].append(elapsed)
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+
+        return response
+
+    # ----------------------------
+    # Hedging
+    # ----------------------------
+    def _hedge_threshold(self, tier):
+        with self._lock:
+            latencies = list(self._stats[tier]["latencies"])
+        if len(latencies) < self.hedging["min_samples"]:
+            return self.hedging["initial_threshold"]
+        return percentile(latencies, self.hedging["percentile"])
+
+    def _reserve_hedge(self, tier):
+        with self._lock:
+            stats = self._stats[tier]
+            if stats["hedges"] + 1 > self.hedging["max_hedge_rate"] * stats["requests"]:
+                return False
+            stats["hedges"] += 1
+            return True
+
+    def _count_wasted(self, tier, future):
+        # Loser finished after the winner: its tokens were pure overhead
+        if future.cancelled() or future.exception() is not None:
+            return
+        prompt_tokens, completion_tokens = token_usage(future.result())
+        with self._lock:
+            self._stats[tier]["hedge_wasted_tokens"] += prompt_tokens + completion_tokens
+
+    def _start_primary(self, tier, messages):
+        """
+        Runs the primary attempt on its own thread (not the backup pool,
+        so hedging never caps concurrency). Returns (future, started).
+        """
+        future = Future()
+        started = threading.Event()
+
+        def run():
+            future.set_running_or_notify_cancel()
+            started.set()
+            try:
+                future.set_result(self._attempt(tier, messages))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True, name="llm-primary").start()
+        return future, started
+
+    def _call_hedged(self, tier, messages):
+        primary, started = self._start_primary(tier, messages)
+
+        # Threshold clock starts when the attempt does
+        started.wait()
+        done, _ = wait([primary], timeout=self._hedge_threshold(tier))
+        if done or not self._reserve_hedge(tier):
+            return primary.result()
+
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(
+                    max_workers=HEDGE_WORKERS,
+                    thread_name_prefix="llm-hedge"
+                )
+            pool = self._hedge_pool
+
+        backup = pool.submit(self._attempt, tier, messages)
+        pending = {primary, backup}
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+            if winner is None:
+                continue
+
+            for loser in pending:
+                # Not started → dropped. Running → result ignored
+                # (sync HTTP calls can't be interrupted; bounded by tier timeout)
+                if not loser.cancel():
+                    loser.add_done_callback(
+                        lambda f: self._count_wasted(tier, f)
+                    )
+
+            if winner is backup:
+                with self._lock:
+                    self._stats[tier]["hedge_wins"] += 1
+            return winner.result()
+
+        # Both attempts failed
+        return primary.result()
+
+    # ----------------------------
+    # One request to a tier
+    # ----------------------------
+    def _call(self, tier, messages):
+        with self._lock:
+            self._stats[tier]["requests"] += 1
+
+        start = time.perf_counter()
+        if self.hedging["enabled"] and self.temperature == 0:
+            response = self._call_hedged(tier, messages)
+        else:
+            response = self._attempt(tier, messages)
+
+        with self._lock:
+            self._stats[tier]["request_latencies"].append(time.perf_counter() - start)
+        return response
+
+    # ----------------------------
+    # Prompt fingerprint (coalescing key)
+    # ----------------------------
+    def prompt_fingerprint(self, messages, prompt_type):
+        tier = self.tier_for(prompt_type)
+        payload = {
+            "prompt_type": prompt_type,
+            "tier": self.tiers[tier],
+            "temperature": self.temperature,
+            "messages": [(m.type, m.content) for m in messages],
+        }
+        blob = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    def invoke(self, messages, prompt_type=None, validate=None, force=False):
+        """
+        messages: LangChain messages (same as ChatGroq.invoke)
+        prompt_type: key of PROMPT_ROUTES
+        validate: callable(content) that raises if the output is unusable
+        force: never share another caller's in-flight result (regeneration)
+        """
+        if self.coalescer is None or force:
+            return self._invoke_routed(messages, prompt_type, validate)
+
+        payload = self.coalescer.run(
+            self.prompt_fingerprint(messages, prompt_type),
+            lambda: {
+                "content": self._invoke_routed(messages, prompt_type, validate).content
+            }
+        )
+        return AIMessage(content=payload["content"])
+
+    def _invoke_routed(self, messages, prompt_type, validate):
+        tier = self.tier_for(prompt_type)
+
+        try:
+            response = self._call(tier, messages)
+            if validate is not None and tier != FALLBACK_TIER:
+                validate(response.content)
+            return response
+        except Exception:
+            if tier == FALLBACK_TIER:
+                raise
+
+        with self._lock:
+            self._stats[tier]["fallbacks"] += 1
+
+        return self._call(FALLBACK_TIER, messages)
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def metrics(self):
+        with self._lock:
+            report = []
+            for tier, stats in self._stats.items():
+                latencies = list(stats["request_latencies"])
+                report.append({
+                    "tier": tier,
+                    "model": self.tiers[tier]["model"],
+                    "requests": stats["requests"],
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "fallbacks": stats["fallbacks"],
+                    "p50_s": round(percentile(latencies, 50), 2),
+                    "p95_s": round(percentile(latencies, 95), 2),
+                    "p99_s": round(percentile(latencies, 99), 2),
+                    "hedges": stats["hedges"],
+                    "hedge_wins": stats["hedge_wins"],
+                    "hedge_wasted_tokens": stats["hedge_wasted_tokens"],
+                    "prompt_tokens": stats["prompt_tokens"],
+                    "completion_tokens": stats["completion_tokens"],
+                })
+            return report
+
+# =====================================================
+# SHARED ROUTER (ONE PER PROCESS)
+# =====================================================
+_router = None
+_router_lock = threading.Lock()
+
+
+def load_routing_config():
+    config = st.secrets.get("llm_routing", {})
+
+    tiers = {name: dict(cfg) for name, cfg in MODEL_TIERS.items()}
+    for name, cfg in config.get("tiers", {}).items():
+        tiers.setdefault(name, {}).update(cfg)
+
+    routes = dict(PROMPT_ROUTES)
+    routes.update(config.get("routes", {}))
+
+    hedging = dict(HEDGING)
+    hedging.update(config.get("hedging", {}))
+
+    return tiers, routes, hedging
+
+
+def get_router(api_key=None):
+    global _router
+    with _router_lock:
+        if _router is None:
+            tiers, routes, hedging = load_routing_config()
+            _router = ModelRouter(
+                api_key=api_key,
+                tiers=tiers,
+                routes=routes,
+                coalescer=SingleFlight(),
+                hedging=hedging
+            )
+        return _router
@@ -0,0 +1,696 @@
+# load_test.py
+#
+# Multi-user load test for app.py.
+#
+# Drives the real Streamlit script through scripted recruiter sessions
+# (fetch → select → draft → answer questions → final) with Streamlit's
+# AppTest driver, against a stub LLM with realistic latency and a fake
+# sheet loader. No Groq or Google calls are made.
+#
+# Each simulated user runs in its own process; users share the JD store
+# and the LLM coalescer through SQLite, as app processes on one host do.
+#
+# Usage:
+#   python load_test.py --levels 1 2 4 8 16 --sessions-per-user 2
+#   python load_test.py --speculative --json load_report.json
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import statistics
+import tempfile
+import sys
+import time
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from llm_router import percentile
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+STEPS = ["load", "fetch", "select", "draft", "final"]
+
+# =====================================================
+# STUB LLM (REALISTIC LATENCY)
+# =====================================================
+# Median seconds per prompt kind, log-normal spread
+LATENCY_PROFILE = {
+    "titles": 0.4,
+    "questions": 1.6,
+    "jd": 3.2,
+    "bundle": 4.0,
+    "title_batch": 0.9,
+}
+LATENCY_SIGMA = 0.45
+
+# Smaller models answer faster (matched by substring of the model name)
+MODEL_SPEED = {
+    "8b": 0.3,
+}
+
+# =====================================================
+# HEDGING SETTINGS FOR --hedge
+# =====================================================
+# Each user process has its own router and sends only a handful of
+# requests per tier, so the app defaults (10% rate, 20 samples, 10 s
+# initial threshold) never allow a hedge here. initial_threshold is
+# set from --latency-scale (see load_test_hedging).
+LOAD_TEST_HEDGING = {
+    "min_samples": 5,
+    "percentile": 90,
+    "max_hedge_rate": 0.25,
+}
+
+STUB_TITLES = [
+    "Operations Lead",
+    "Operations Manager",
+    "Business Operations Lead",
+    "Program Manager",
+    "Operations Specialist",
+]
+
+STUB_QUESTIONS = [
+    {
+        "question": "Who will this role primarily work with day to day?",
+        "options": ["Sales team", "Operations team", "Founders", "External partners"],
+    },
+    {
+        "question": "How much of the role is individual execution vs team management?",
+        "options": ["Fully individual", "Mostly individual", "Mostly managing"],
+    },
+    {
+        "question": "Which outcome matters most in the first 90 days?",
+        "options": ["Revenue", "Process setup", "Hiring", "Customer retention"],
+    },
+    {
+        "question": "Where does this role spend most of its time?",
+        "options": ["In office", "In the field", "Remote"],
+    },
+]
+
+STUB_JD = """Role Title
+{title}
+
+About WOGOM
+Placeholder
+
+Role Overview
+This role exists to own a core workflow end to end.
+
+What You'll Do?
+You will own execution from planning to delivery.
+• Ship weekly outputs that move the core metric
+• Run reviews with the team
+• Report progress to leadership
+• Fix process gaps as they appear
+
+Who’ll Succeed in this Role?
+Someone who takes ownership and moves fast.
+
+Must-Have Skills
+• Execution – ships on time
+• Communication – keeps everyone aligned
+
+Preferred Skills
+• Analytics – reads the numbers
+• Tooling – automates repetitive work
+"""
+
+
+STUB_BUNDLE = {
+    "draft": {
+        "role_overview": "This role exists to own a core workflow end to end.",
+        "execution_summary": "You will own execution from planning to delivery.",
+        "responsibilities": [
+            "Ship weekly outputs that move the core metric",
+            "Run reviews with the team",
+            "Report progress to leadership",
+            "Fix process gaps as they appear",
+        ],
+        "who_will_succeed": "Someone who takes ownership and moves fast.",
+        "must_have_skills": ["Execution – ships on time", "Communication – keeps everyone aligned"],
+        "preferred_skills": ["Analytics – reads the numbers", "Tooling – automates repetitive work"],
+    },
+    "title_alternatives": ["Operations Lead", "Operations Manager", "Program Manager"],
+    "questions": STUB_QUESTIONS,
+}
+
+
+def stub_questions(count):
+    return [
+        {
+            "question": f"{q['question']} ({i + 1})",
+            "options": q["options"],
+        }
+        for i, q in zip(range(count), itertools.cycle(STUB_QUESTIONS))
+    ]
+
+
+class _StubMessage:
+    def __init__(self, content, prompt):
+        self.content = content
+        # ~4 characters per token
+        self.response_metadata = {
+            "token_usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+            }
+        }
+
+
+class StubChatGroq:
+    """
+    Drop-in for langchain_groq.ChatGroq.
+    Sleeps for a log-normal latency, then answers by prompt kind.
+    """
+
+    latency_scale = 1.0
+    # Questions per draft (cycles STUB_QUESTIONS with unique wording)
+    question_count = len(STUB_QUESTIONS)
+
+    def __init__(self, *args, **kwargs):
+        self.model = kwargs.get("model", "stub")
+
+    @staticmethod
+    def _kind(prompt):
+        if '"title_alternatives"' in prompt:
+            return "bundle"
+        if "Current job titles (JSON array):" in prompt:
+            return "title_batch"
+        if "alternative job titles" in prompt:
+            return "titles"
+        if '"question": "string"' in prompt:
+            return "questions"
+        return "jd"
+
+    def invoke(self, messages, *args, **kwargs):
+        prompt = "\n".join(m.content for m in messages)
+        kind = self._kind(prompt)
+
+        median = LATENCY_PROFILE[kind] * self.latency_scale
+        for marker, speed in MODEL_SPEED.items():
+            if marker in self.model:
+                median *= speed
+        time.sleep(random.lognormvariate(0, LATENCY_SIGMA) * median)
+
+        if kind == "titles":
+            content = json.dumps(STUB_TITLES)
+        elif kind == "title_batch":
+            listed = prompt.split("Current job titles (JSON array):", 1)[1]
+            titles = json.loads(listed.strip().split("\n", 1)[0])
+            content = json.dumps({t: STUB_TITLES for t in titles})
+        elif kind == "questions":
+            content = json.dumps(stub_questions(self.question_count))
+        elif kind == "bundle":
+            content = json.dumps(
+                dict(STUB_BUNDLE, questions=stub_questions(self.question_count))
+            )
+        else:
+            content = STUB_JD.format(title="Operations Lead")
+
+        return _StubMessage(content, prompt)
+
+# =====================================================
+# FAKE SHEET LOADER
+# =====================================================
+FAKE_TITLES = [
+    "Operations Lead", "Sales Executive", "HR Manager", "AI Engineer",
+    "Category Manager", "Finance Analyst", "Customer Success Lead",
+    "Data Analyst", "Field Sales Manager", "Product Manager",
+]
+
+
+def make_fake_loader(n_rows, load_latency):
+    rows = []
+    for i in range(n_rows):
+        rows.append({
+            "Timestamp": f"1/{(i % 28) + 1}/2026 10:00:00",
+            "Job Title": f"{FAKE_TITLES[i % len(FAKE_TITLES)]} {i // len(FAKE_TITLES) or ''}".strip(),
+            "Location": "Mumbai",
+            "Employment Type": "Full-time",
+            "Work mode": "On-site",
+            "Does this role require travel?": "Occasional",
+            "How urgent is this hire?": "Within 30 days",
+            "Salary Range": "8–12 LPA",
+            "What is the single core responsibility of this role?": "Own daily execution",
+            "Key Responsibilities": "Plan, execute, report, improve",
+            "Top 3 skills this role MUST have": "Execution, Communication, Ownership",
+            "Minimum education required": "Graduate",
+            "Minimum experience required": "3 years",
+            "other skills": "Excel",
+        })
+
+    def load_form_data(*args, **kwargs):
+        time.sleep(load_latency)
+        return pd.DataFrame(rows)
+
+    return load_form_data
+
+# =====================================================
+# PATCH APP DEPENDENCIES
+# =====================================================
+def install_stubs(n_rows, load_latency, latency_scale, question_count):
+    # Must run BEFORE any app module is imported
+    import langchain_groq
+    import google_sheets
+    import llm_router
+
+    StubChatGroq.latency_scale = latency_scale
+    StubChatGroq.question_count = question_count
+    langchain_groq.ChatGroq = StubChatGroq
+    llm_router.ChatGroq = StubChatGroq
+    google_sheets.load_form_data = make_fake_loader(n_rows, load_latency)
+
+
+def reset_store(path=None):
+    """
+    Installs a JD store at `path` (default: fresh temp file),
+    so every generation is a real (stub) LLM call. Returns the path.
+    """
+    import jd_store
+
+    jd_store._store = jd_store.JDStore(
+        path or os.path.join(tempfile.mkdtemp(), "jd_store.sqlite3")
+    )
+    return jd_store._store.path
+
+
+def reset_coalescer(path=None):
+    """
+    Points the LLM coalescer at `path` (default: fresh temp file) instead
+    of output/, so stub runs never share leases with a real app process.
+    Must run before the shared router is created. Returns the path.
+    """
+    import llm_coalesce
+
+    llm_coalesce.COALESCE_PATH = (
+        path or os.path.join(tempfile.mkdtemp(), "llm_coalesce.sqlite3")
+    )
+    return llm_coalesce.COALESCE_PATH
+
+# =====================================================
+# ONE SCRIPTED SESSION
+# =====================================================
+def _button(at, prefix):
+    return next(b for b in at.button if b.label.startswith(prefix))
+
+
+def new_app():
+    at = AppTest.from_file(APP_PATH, default_timeout=300)
+    at.secrets["GROQ_API_KEY"] = "stub"
+    at.secrets["google_service_account"] = {}
+    return at
+
+
+def run_session(session_id, speculative, timings, structured=False):
+    def timed(step, action):
+        start = time.perf_counter()
+        action()
+        timings[step].append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(f"{step}: {at.exception[0].value}")
+
+    at = new_app()
+
+    timed("load", at.run)
+
+    if speculative:
+        next(t for t in at.toggle if "Speculative" in t.label).set_value(True)
+        at.run()
+
+    if structured:
+        next(t for t in at.toggle if "Single-call" in t.label).set_value(True)
+        at.run()
+
+    timed("fetch", lambda: _button(at, "📥").click().run())
+
+    picker = next(s for s in at.selectbox if s.label.startswith("🎯"))
+    label = picker.options[session_id % len(picker.options)]
+    timed("select", lambda: picker.select(label).run())
+
+    timed("draft", lambda: _button(at, "🚀").click().run())
+
+    # Answers live in a form: picking options doesn't rerun the script
+    # (nothing to time); they are sent once with the timed submit below
+    for radio in at.radio:
+        radio.set_value(radio.options[0])
+
+    timed("final", lambda: _button(at, "✨").click().run())
+
+    # Script-side render time per scope, as recorded by app.py
+    if "rerun_ms" in at.session_state:
+        for scope, samples in at.session_state["rerun_ms"].items():
+            timings.setdefault(f"rerun: {scope}", []).extend(
+                ms / 1000 for ms in samples
+            )
+
+# =====================================================
+# ONE SIMULATED USER (OWN PROCESS)
+# =====================================================
+# AppTest swaps process-wide Streamlit state (runtime, secrets, config)
+# on every run, so concurrent sessions must not share a process.
+def router_snapshot(router):
+    """
+    Raw per-tier counters + request latencies, so tiers from several
+    processes can be merged (see merge_tiers).
+    """
+    with router._lock:
+        return {
+            tier: {
+                "model": router.tiers[tier]["model"],
+                **{k: v for k, v in stats.items() if isinstance(v, int)},
+                "request_latencies": list(stats["request_latencies"]),
+            }
+            for tier, stats in router._stats.items()
+        }
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process (None where unsupported).
+    Read from the OS, so it adds nothing to the timed sessions.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1024
+
+
+def user_process(user_id, config, store_path, coalesce_path, barrier, results):
+    timings = {step: [] for step in STEPS}
+    errors = []
+    report = {"timings": timings, "errors": errors, "start": None, "end": None,
+              "rss_warm_mb": None, "rss_peak_mb": None, "tiers": {}, "coalesced": {}}
+    try:
+        install_stubs(
+            config["rows"], config["sheet_latency"],
+            config["latency_scale"], config["questions"]
+        )
+        reset_store(store_path)
+        reset_coalescer(coalesce_path)
+
+        # Warm-up: imports the app modules outside the timed window
+        # (the initial run makes no LLM calls)
+        new_app().run()
+
+        import llm_router
+        router = llm_router.get_router()
+        router.hedging.update(config["hedging"])
+
+        report["rss_warm_mb"] = peak_rss_mb()
+
+        barrier.wait()
+        report["start"] = time.time()
+        for s in range(config["sessions_per_user"]):
+            try:
+                run_session(
+                    user_id * config["sessions_per_user"] + s,
+                    config["speculative"], timings, config["structured"]
+                )
+            except Exception as e:
+                errors.append(repr(e))
+        report["end"] = time.time()
+        report["rss_peak_mb"] = peak_rss_mb()
+
+        report["tiers"] = router_snapshot(router)
+        report["coalesced"] = router.coalescer.metrics()
+    except Exception as e:
+        # Don't leave the other users waiting at the barrier
+        barrier.abort()
+        errors.append(repr(e))
+    results.put(report)
+
+# =====================================================
+# STATS
+# =====================================================
+def merge_tiers(snapshots):
+    """
+    Same shape as ModelRouter.metrics(), over several processes.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for tier, stats in snapshot.items():
+            total = merged.setdefault(tier, {"model": stats["model"], "request_latencies": []})
+            for key, value in stats.items():
+                if key == "request_latencies":
+                    total[key].extend(value)
+                elif key != "model":
+                    total[key] = total.get(key, 0) + value
+
+    report = []
+    for tier, stats in merged.items():
+        latencies = stats["request_latencies"]
+        report.append({
+            "tier": tier,
+            "model": stats["model"],
+            "requests": stats.get("requests", 0),
+            "calls": stats.get("calls", 0),
+            "errors": stats.get("errors", 0),
+            "fallbacks": stats.get("fallbacks", 0),
+            "p50_s": round(percentile(latencies, 50), 2),
+            "p95_s": round(percentile(latencies, 95), 2),
+            "p99_s": round(percentile(latencies, 99), 2),
+            "hedges": stats.get("hedges", 0),
+            "hedge_wins": stats.get("hedge_wins", 0),
+            "hedge_wasted_tokens": stats.get("hedge_wasted_tokens", 0),
+            "prompt_tokens": stats.get("prompt_tokens", 0),
+            "completion_tokens": stats.get("completion_tokens", 0),
+        })
+    return report
+
+
+def run_level(users, config, store_path=None):
+    if store_path is None:
+        store_path = reset_store()
+    # Users of one level coalesce with each other, never with other runs
+    coalesce_path = reset_coalescer()
+
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(users)
+    results = ctx.Queue()
+
+    procs = [
+        ctx.Process(
+            target=user_process,
+            args=(user_id, config, store_path, coalesce_path, barrier, results)
+        )
+        for user_id in range(users)
+    ]
+    for proc in procs:
+        proc.start()
+
+    # Drain before join: a full queue blocks the child from exiting
+    reports = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    timings = {step: [] for step in STEPS}
+    errors = []
+    for report in reports:
+        errors.extend(report["errors"])
+        for step, values in report["timings"].items():
+            timings.setdefault(step, []).extend(values)
+
+    starts = [r["start"] for r in reports if r["start"] is not None]
+    ends = [r["end"] for r in reports if r["end"] is not None]
+    elapsed = max(ends) - min(starts) if starts and ends else 0.0
+
+    coalesced = {}
+    for report in reports:
+        for key, value in report["coalesced"].items():
+            coalesced[key] = coalesced.get(key, 0) + value
+
+    rss = [r for r in reports if r["rss_peak_mb"] is not None]
+
+    sessions = users * config["sessions_per_user"]
+    return {
+        "users": users,
+        "sessions": sessions,
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "elapsed_s": elapsed,
+        "throughput_sessions_per_min": (
+            (sessions - len(errors)) / elapsed * 60 if elapsed else 0.0
+        ),
+        # Whole user process (interpreter + app modules + its sessions)
+        "peak_rss_per_user_mb": (
+            statistics.fmean(r["rss_peak_mb"] for r in rss) if rss else None
+        ),
+        # Peak growth after warm-up, i.e. what the timed sessions added
+        "rss_growth_per_user_mb": (
+            statistics.fmean(r["rss_peak_mb"] - r["rss_warm_mb"] for r in rss)
+            if rss else None
+        ),
+        "steps": {
+            step: {
+                "n": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "mean": statistics.fmean(values) if values else 0.0,
+            }
+            for step, values in timings.items()
+        },
+        "tier_snapshots": [r["tiers"] for r in reports],
+        "coalesced": coalesced,
+    }
+
+def load_test_hedging(latency_scale):
+    # Hedge the slowest prompt kind once it runs ~1.5× its median
+    return dict(
+        LOAD_TEST_HEDGING,
+        enabled=True,
+        initial_threshold=max(LATENCY_PROFILE["jd"] * latency_scale * 1.5, 0.01),
+    )
+
+
+def run_all_levels(config, levels, warm_store=False):
+    # --warm-store: one store shared by all levels
+    store_path = reset_store() if warm_store else None
+
+    results = [run_level(users, config, store_path) for users in levels]
+
+    coalesced = {}
+    for r in results:
+        for key, value in r["coalesced"].items():
+            coalesced[key] = coalesced.get(key, 0) + value
+
+    return {
+        "levels": results,
+        "tiers": merge_tiers(
+            snapshot for r in results for snapshot in r.pop("tier_snapshots")
+        ),
+        "coalesced": coalesced,
+    }
+
+# =====================================================
+# REPORT
+# =====================================================
+def print_report(results):
+    for r in results:
+        mem = (
+            f"peak RSS {r['peak_rss_per_user_mb']:.0f} MB/user process "
+            f"(+{r['rss_growth_per_user_mb']:.1f} MB during sessions)"
+            if r["peak_rss_per_user_mb"] is not None else "RSS not available"
+        )
+        print(
+            f"\n=== {r['users']} concurrent users · {r['sessions']} sessions · "
+            f"{r['throughput_sessions_per_min']:.1f} sessions/min · {mem} · "
+            f"{r['errors']} errors ==="
+        )
+        print(f"{'step':<22}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}")
+        extra = sorted(k for k in r["steps"] if k not in STEPS)
+        for step in STEPS + extra:
+            s = r["steps"][step]
+            print(
+                f"{step:<22}{s['n']:>6}"
+                f"{s['p50']:>9.3f}s{s['p95']:>9.3f}s{s['p99']:>9.3f}s"
+            )
+        for sample in r["error_samples"]:
+            print(f"  error: {sample}")
+
+
+def print_tiers(tiers, coalesced):
+    print("\n=== LLM tiers ===")
+    for t in tiers:
+        print(
+            f"{t['tier']:<8}{t['model']:<28}calls={t['calls']:<6}"
+            f"fallbacks={t['fallbacks']:<4}p50={t['p50_s']:.2f}s p95={t['p95_s']:.2f}s "
+            f"p99={t['p99_s']:.2f}s tokens={t['prompt_tokens']}+{t['completion_tokens']} "
+            f"hedges={t['hedges']} (won {t['hedge_wins']}, "
+            f"wasted tokens {t['hedge_wasted_tokens']})"
+        )
+    print(
+        f"coalesced: {coalesced.get('shared', 0)} shared · {coalesced.get('led', 0)} led · "
+        f"{coalesced.get('takeovers', 0)} takeovers"
+    )
+
+
+def print_hedge_comparison(baseline, hedged):
+    print("\n=== Hedging: p99 and tokens (baseline → hedged) ===")
+    for before, after in zip(baseline["levels"], hedged["levels"]):
+        for step in ("draft", "final"):
+            b, a = before["steps"][step]["p99"], after["steps"][step]["p99"]
+            print(
+                f"{before['users']:>3} users  {step:<8}"
+                f"p99 {b:.3f}s → {a:.3f}s ({a - b:+.3f}s)"
+            )
+
+    after_tiers = {t["tier"]: t for t in hedged["tiers"]}
+    for b in baseline["tiers"]:
+        a = after_tiers[b["tier"]]
+        tokens_b = b["prompt_tokens"] + b["completion_tokens"]
+        tokens_a = a["prompt_tokens"] + a["completion_tokens"]
+        print(
+            f"{b['tier']:<8}p99 {b['p99_s']:.2f}s → {a['p99_s']:.2f}s · "
+            f"tokens {tokens_b} → {tokens_a} ({tokens_a - tokens_b:+d}) · "
+            f"hedges {a['hedges']} (won {a['hedge_wins']}, "
+            f"wasted tokens {a['hedge_wasted_tokens']})"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the JD Generator app")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--sessions-per-user", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=50, help="Fake sheet size")
+    parser.add_argument("--questions", type=int, default=len(STUB_QUESTIONS),
+                        help="Clarifying questions per draft")
+    parser.add_argument("--sheet-latency", type=float, default=0.8)
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiply stub LLM latencies (0 = no delay)")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Enable speculative prefetch in every session")
+    parser.add_argument("--structured", action="store_true",
+                        help="Use single-call structured draft generation")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Run every level without, then with hedging; "
+                             "compare p99 and tokens")
+    parser.add_argument("--warm-store", action="store_true",
+                        help="Keep the JD store between levels (measures store hits)")
+    parser.add_argument("--json", help="Write the full report to this file")
+    args = parser.parse_args()
+
+    config = {
+        "rows": args.rows,
+        "sheet_latency": args.sheet_latency,
+        "latency_scale": args.latency_scale,
+        "questions": args.questions,
+        "sessions_per_user": args.sessions_per_user,
+        "speculative": args.speculative,
+        "structured": args.structured,
+        "hedging": {"enabled": False},
+    }
+
+    # --hedge: the same levels without, then with hedging
+    configs = {"baseline": config}
+    if args.hedge:
+        configs["hedged"] = dict(
+            config, hedging=load_test_hedging(args.latency_scale)
+        )
+
+    runs = {}
+    for name, cfg in configs.items():
+        if args.hedge:
+            print(f"\n##### {name} #####")
+        runs[name] = run_all_levels(cfg, args.levels, args.warm_store)
+        print_report(runs[name]["levels"])
+        print_tiers(runs[name]["tiers"], runs[name]["coalesced"])
+
+    if args.hedge:
+        print_hedge_comparison(runs["baseline"], runs["hedged"])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(runs if args.hedge else runs["baseline"], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()